@@ -1,13 +1,23 @@
 import pygame
+import numpy as np
 from player import Player
 from config import *
+from simulation import object_arrays
 
 class AIPlayer(Player):
-    def __init__(self, x, y):
+    # "reference" keeps the original per-object loops and 50 px zones;
+    # "vectorized" scores every AI_ZONE_WIDTH candidate position in one pass.
+    def __init__(self, x, y, mode="vectorized", zone_width=AI_ZONE_WIDTH,
+                 reaction_distance=AI_REACTION_DISTANCE, lookahead=AI_PREDICTION_LOOKAHEAD):
         super().__init__(x, y, PLAYER2_COLOR, "AI Player")
+        self.reaction_distance = reaction_distance
+        self.lookahead = lookahead
         self.target_x = x
         self.threat_map = {}
         self.decision_cooldown = 0
+        self.mode = mode
+        self.zone_width = 50 if mode == "reference" else zone_width
+        self.zone_x = np.arange(0, SCREEN_WIDTH - self.width, self.zone_width, dtype=np.float64)
 
     def analyze_threats(self, falling_objects):
         threats = []
@@ -17,7 +27,7 @@ class AIPlayer(Player):
             time_to_impact = distance_to_impact / obj.speed if obj.speed > 0 else float('inf')
 
             future_obj_x = obj.x
-            future_obj_y = obj.y + (obj.speed * AI_PREDICTION_LOOKAHEAD)
+            future_obj_y = obj.y + (obj.speed * self.lookahead)
 
             horizontal_distance = abs((self.x + self.width // 2) - (future_obj_x + obj.size // 2))
 
@@ -27,7 +37,7 @@ class AIPlayer(Player):
                 horizontal_distance < (self.width // 2 + obj.size // 2)
             )
 
-            if obj.y < AI_REACTION_DISTANCE and will_collide:
+            if obj.y < self.reaction_distance and will_collide:
                 threat_level = 1.0 / (time_to_impact + 1)
                 threats.append({
                     'object': obj,
@@ -64,7 +74,45 @@ class AIPlayer(Player):
         safest_zone = min(zones, key=lambda z: z['danger_score'])
         return safest_zone['x']
 
+    def threat_mask(self, obj_x, obj_y, obj_size, obj_speed):
+        future_y = obj_y + obj_speed * self.lookahead
+        horizontal_distance = np.abs((self.x + self.width // 2) - (obj_x + obj_size // 2))
+        will_collide = (
+            (future_y + obj_size >= self.y) &
+            (future_y <= self.y + self.height) &
+            (horizontal_distance < (self.width // 2 + obj_size // 2))
+        )
+        return (obj_y < self.reaction_distance) & will_collide
+
+    def danger_scores(self, obj_x, obj_y, obj_size, obj_speed):
+        relevant = (obj_y < SCREEN_HEIGHT // 2) & (obj_y + obj_speed * 60 > self.y)
+        obj_center = obj_x[relevant] + obj_size[relevant] // 2
+        distance = np.abs((self.zone_x + self.width // 2)[:, None] - obj_center[None, :])
+        danger = np.where(distance < obj_size[relevant] + self.width, (1.0 / (distance + 1)) * 100, 0.0)
+        return danger.sum(axis=1)
+
+    def find_safe_zone_vectorized(self, obj_x, obj_y, obj_size, obj_speed):
+        scores = self.danger_scores(obj_x, obj_y, obj_size, obj_speed)
+        return int(self.zone_x[np.argmin(scores)])
+
+    def decide_action_arrays(self, obj_x, obj_y, obj_size, obj_speed):
+        if self.decision_cooldown > 0:
+            self.decision_cooldown -= 1
+            return
+
+        if self.threat_mask(obj_x, obj_y, obj_size, obj_speed).any():
+            self.target_x = self.find_safe_zone_vectorized(obj_x, obj_y, obj_size, obj_speed)
+            self.decision_cooldown = 5
+        else:
+            center_x = SCREEN_WIDTH // 2 - self.width // 2
+            if abs(self.x - center_x) > 100:
+                self.target_x = center_x
+
     def decide_action(self, falling_objects):
+        if self.mode != "reference":
+            self.decide_action_arrays(*object_arrays(falling_objects))
+            return
+
         if self.decision_cooldown > 0:
             self.decision_cooldown -= 1
             return
@@ -0,0 +1,136 @@
+import multiprocessing as mp
+import os
+import numpy as np
+from config import *
+from vec_env import DodgeVecEnv
+
+BC_SAMPLES = 200000
+BC_ENVS_PER_WORKER = 64
+# With the stock reaction distance the heuristic never sees a threat before it
+# is too late to move, so the teacher watches the whole screen and looks further ahead.
+BC_TEACHER_REACTION_DISTANCE = SCREEN_HEIGHT
+BC_TEACHER_LOOKAHEAD = 60
+
+
+def heuristic_action(player):
+    # Same dead zone AIPlayer.update uses before moving towards its target
+    player_center = player.x + player.width // 2
+    target_center = player.target_x + player.width // 2
+    if abs(player_center - target_center) <= 5:
+        return 0
+    return 2 if target_center > player_center else 1
+
+
+def make_teacher(x, y):
+    from ai_player import AIPlayer
+    return AIPlayer(x, y, reaction_distance=BC_TEACHER_REACTION_DISTANCE, lookahead=BC_TEACHER_LOOKAHEAD)
+
+
+def collect_heuristic_dataset(n_samples, n_envs=BC_ENVS_PER_WORKER, seed=None, action_repeat=1, frame_stack=1):
+    base_env = env = DodgeVecEnv(n_envs=n_envs, seed=seed, action_repeat=action_repeat)
+    if frame_stack > 1:
+        from stable_baselines3.common.vec_env import VecFrameStack
+        env = VecFrameStack(base_env, frame_stack)
+    obs = env.reset()
+    player_y = SCREEN_HEIGHT - PLAYER_HEIGHT
+    players = [make_teacher(int(x), player_y) for x in base_env.ai_x]
+
+    steps = -(-n_samples // n_envs)
+    observations = np.empty((steps, n_envs, obs.shape[1]), dtype=np.float32)
+    actions = np.empty((steps, n_envs), dtype=np.int64)
+
+    for step in range(steps):
+        observations[step] = obs
+        for env_idx, player in enumerate(players):
+            count = base_env.count[env_idx]
+            player.x = int(base_env.ai_x[env_idx])
+            player.decide_action_arrays(
+                base_env.obj_x[env_idx, :count], base_env.obj_y[env_idx, :count],
+                base_env.obj_size[env_idx, :count], base_env.obj_speed[env_idx, :count])
+            actions[step, env_idx] = heuristic_action(player)
+
+        obs, _, dones, _ = env.step(actions[step])
+        for env_idx in np.flatnonzero(dones):
+            players[env_idx] = make_teacher(int(base_env.ai_x[env_idx]), player_y)
+
+    return observations.reshape(-1, obs.shape[1])[:n_samples], actions.reshape(-1)[:n_samples]
+
+
+def _collect_worker(args):
+    return collect_heuristic_dataset(*args)
+
+
+def collect_parallel(n_samples=BC_SAMPLES, workers=None, envs_per_worker=BC_ENVS_PER_WORKER, seed=0,
+                     action_repeat=1, frame_stack=1):
+    workers = workers or os.cpu_count() or 1
+    share = -(-n_samples // workers)
+    jobs = [(share, envs_per_worker, seed + worker, action_repeat, frame_stack) for worker in range(workers)]
+    if workers == 1:
+        parts = [_collect_worker(jobs[0])]
+    else:
+        with mp.get_context().Pool(workers) as pool:
+            parts = pool.map(_collect_worker, jobs)
+    observations = np.concatenate([part[0] for part in parts])[:n_samples]
+    actions = np.concatenate([part[1] for part in parts])[:n_samples]
+    return observations, actions
+
+
+def class_weights(actions, n_actions=3):
+    # Inverse frequency, so the rare moves weigh as much in the loss as "stay"
+    # (the teacher stays put for ~96% of its decisions)
+    counts = np.bincount(actions, minlength=n_actions)
+    return len(actions) / (n_actions * np.maximum(counts, 1))
+
+
+def balanced_accuracy(predicted, actions, n_actions=3):
+    # Mean per-class recall; a constant policy scores 1/n_actions however skewed the data
+    recalls = [(predicted[actions == action] == action).float().mean().item()
+               for action in range(n_actions) if (actions == action).any()]
+    return sum(recalls) / len(recalls)
+
+
+def pretrain_policy(model, observations, actions, epochs=10, batch_size=1024, learning_rate=1e-3):
+    import torch
+
+    policy = model.policy
+    policy.set_training_mode(True)
+    optimizer = torch.optim.Adam(policy.parameters(), lr=learning_rate)
+    obs_tensor = torch.as_tensor(observations, device=policy.device)
+    action_tensor = torch.as_tensor(actions, device=policy.device)
+    weight_tensor = torch.as_tensor(class_weights(actions), dtype=torch.float32, device=policy.device)
+
+    for epoch in range(epochs):
+        permutation = torch.randperm(len(obs_tensor), device=policy.device)
+        total_loss = 0.0
+        for start in range(0, len(permutation), batch_size):
+            batch = permutation[start:start + batch_size]
+            distribution = policy.get_distribution(obs_tensor[batch])
+            weights = weight_tensor[action_tensor[batch]]
+            loss = -(distribution.log_prob(action_tensor[batch]) * weights).sum() / weights.sum()
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(batch)
+
+        with torch.no_grad():
+            predicted = policy.get_distribution(obs_tensor).distribution.probs.argmax(dim=1)
+            accuracy = balanced_accuracy(predicted, action_tensor)
+        print(f"BC epoch {epoch + 1}/{epochs}: weighted loss {total_loss / len(permutation):.4f}, "
+              f"balanced accuracy {accuracy:.1%}")
+
+    policy.set_training_mode(False)
+    return accuracy
+
+
+def warm_start(model, n_samples=BC_SAMPLES, workers=None, epochs=10, action_repeat=1, frame_stack=1):
+    print(f"Collecting {n_samples} heuristic AI decisions for behavior cloning...")
+    observations, actions = collect_parallel(n_samples, workers=workers, action_repeat=action_repeat,
+                                             frame_stack=frame_stack)
+    counts = np.bincount(actions, minlength=3)
+    print(f"Action mix: stay {counts[0]}, left {counts[1]}, right {counts[2]}")
+    if not counts.all():
+        # A policy cloned from this would never take the missing moves
+        print("Warning: the heuristic never chose some actions, skipping behavior cloning. "
+              "Collect more samples with --bc-samples.")
+        return None
+    return pretrain_policy(model, observations, actions, epochs=epochs)
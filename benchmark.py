@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import numpy as np
+from config import *
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+SEED = 1234
+DENSITIES = (10, 100, 1000)
+STORM_COUNTS = (1000, 5000, 8000)
+ENV_COUNTS = (1, 4, 16)
+VEC_ENV_COUNTS = (4, 64, 256)
+
+
+def populate_world(world, count, seed=SEED):
+    # A seeded mid-game scene: count objects spread over the screen
+    rng = random.Random(seed)
+    world.reset()
+    for _ in range(count):
+        world.spawn(1)
+    index = world.index
+    for obj in world.falling_objects:
+        obj.y = rng.uniform(-OBJECT_MAX_SIZE, SCREEN_HEIGHT - 2 * PLAYER_HEIGHT)
+        index.moved(obj)
+    # Queries are only meaningful if every object sits in the row its y maps to
+    assert all(obj.row == index._row(obj.y) for obj in world.falling_objects)
+
+
+def bench_dodge_env(n_envs, steps=2000):
+    from stable_baselines3.common.vec_env import DummyVecEnv
+    from training_env import DodgeGameEnv
+
+    vec_env = DummyVecEnv([DodgeGameEnv for _ in range(n_envs)])
+    vec_env.seed(SEED)
+    vec_env.reset()
+    actions = np.random.default_rng(SEED).integers(0, 3, size=(steps, n_envs))
+    started = time.perf_counter()
+    for step_actions in actions:
+        vec_env.step(step_actions)
+    elapsed = time.perf_counter() - started
+    vec_env.close()
+    return steps * n_envs / elapsed, "steps/s", True
+
+
+def bench_dodge_vec_env(n_envs, steps=2000):
+    from vec_env import DodgeVecEnv
+
+    vec_env = DodgeVecEnv(n_envs=n_envs, seed=SEED)
+    vec_env.reset()
+    actions = np.random.default_rng(SEED).integers(0, 3, size=(steps, n_envs))
+    started = time.perf_counter()
+    for step_actions in actions:
+        vec_env.step(step_actions)
+    elapsed = time.perf_counter() - started
+    return steps * n_envs / elapsed, "steps/s", True
+
+
+def bench_self_play_env(n_envs, steps=2000):
+    # Matches stepped per second, each with a learner and a pool opponent.
+    # The opponent is a seeded random MLP so no trained model is needed.
+    from numpy_policy import NumpyPolicy
+    from observation import OBSERVATION_SIZE
+    from self_play_env import SelfPlayVecEnv
+
+    rng = np.random.default_rng(SEED)
+    sizes = (OBSERVATION_SIZE, 64, 64, 3)
+    weights = [rng.normal(0, 0.3, (out_size, in_size)) for in_size, out_size in zip(sizes, sizes[1:])]
+    vec_env = SelfPlayVecEnv(n_envs=n_envs, seed=SEED)
+    vec_env.add_opponent(NumpyPolicy(weights, [np.zeros(len(w)) for w in weights]))
+    vec_env.reset()
+    actions = rng.integers(0, 3, size=(steps, n_envs))
+    started = time.perf_counter()
+    for step_actions in actions:
+        vec_env.step(step_actions)
+    elapsed = time.perf_counter() - started
+    return steps * n_envs / elapsed, "steps/s", True
+
+
+def make_game(seed=SEED):
+    from game import Game
+    game = Game(headless=True, ai_vs_ai=True, seed=seed)
+    game.state = "playing"
+    game.reset_game()
+    return game
+
+
+def bench_game_update(ticks=5000):
+    game = make_game()
+    started = time.perf_counter()
+    for _ in range(ticks):
+        if game.state != "playing":
+            game.state = "playing"
+            game.reset_game()
+        game.update()
+    elapsed = time.perf_counter() - started
+    return ticks / elapsed, "ticks/s", True, {"allocation_stats": game.world.allocation_stats()}
+
+
+def bench_ai_decision(density, calls=500):
+    from ai_player import AIPlayer
+    from simulation import World
+
+    world = World()
+    populate_world(world, density)
+    player = AIPlayer(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100)
+    started = time.perf_counter()
+    for _ in range(calls):
+        player.decision_cooldown = 0
+        player.decide_action(world.falling_objects)
+    elapsed = time.perf_counter() - started
+    return elapsed / calls * 1e6, "us/decision", False
+
+
+def bench_trained_ai_update(density, calls=500):
+    from simulation import World
+    from trained_ai_player import TrainedAIPlayer, load_trained_model
+
+    model = load_trained_model()
+    if model is None:
+        return None
+    world = World()
+    populate_world(world, density)
+    player = TrainedAIPlayer(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 100, model)
+    started = time.perf_counter()
+    for _ in range(calls):
+        player.x = SCREEN_WIDTH // 2
+        player.update(world.falling_objects)
+    elapsed = time.perf_counter() - started
+    return elapsed / calls * 1e6, "us/decision", False
+
+
+def bench_player_update(spec, ticks=5000):
+    # Per-tick cost of one player's update over a played game, including the
+    # ticks where a planner only follows its plan
+    from evaluate import make_player
+    from simulation import World
+
+    world = World(rng=random.Random(SEED))
+    player = make_player(spec, SCREEN_WIDTH // 2)
+    elapsed = 0.0
+    for _ in range(ticks):
+        world.spawn()
+        started = time.perf_counter()
+        player.update(world.falling_objects)
+        elapsed += time.perf_counter() - started
+        world.advance()
+        if world.first_collision(*player.rect, snap_to_pixels=True) >= 0:
+            world.reset()
+            player = make_player(spec, SCREEN_WIDTH // 2)
+    return elapsed / ticks * 1e6, "us/tick", False
+
+
+def bench_storm_frame(count, frames=300):
+    # A full storm-mode frame (simulation, both AIs, collisions, draw) with the
+    # world held at `count` objects. Hits are ignored so the scene never resets.
+    from game import Game
+
+    game = Game(headless=True, ai_vs_ai=True, seed=SEED, storm=True, storm_objects=count,
+                storm_curve=((0, float(count)),))
+    game.state = "playing"
+    game.reset_game()
+    world = game.world
+    world.spawn()
+    world.y[:world.count] = np.random.default_rng(SEED).uniform(-OBJECT_MAX_SIZE, SCREEN_HEIGHT, world.count)
+    game.draw()
+    started = time.perf_counter()
+    for _ in range(frames):
+        game.update()
+        game.state = "playing"
+        game.draw()
+    elapsed = time.perf_counter() - started
+    return elapsed / frames * 1e3, "ms/frame", False
+
+
+def bench_render(density, frames=200):
+    game = make_game()
+    populate_world(game.world, density)
+    game.draw()
+    started = time.perf_counter()
+    for _ in range(frames):
+        game.draw()
+    elapsed = time.perf_counter() - started
+    return elapsed / frames * 1e3, "ms/frame", False
+
+
+def bench_capture_frame(frames=300):
+    # Sustained cost per frame of a headless render to a raw file: the copy out
+    # of the display buffer, plus any wait for the writer thread to free a buffer
+    import tempfile
+    from video_capture import VideoCapture
+
+    game = make_game()
+    populate_world(game.world, 100)
+    game.draw()
+    with tempfile.TemporaryDirectory() as directory:
+        capture = VideoCapture(os.path.join(directory, "bench.raw"), game.screen, drop_frames=False)
+        started = time.perf_counter()
+        for _ in range(frames):
+            capture.capture(game.screen)
+        elapsed = time.perf_counter() - started
+        capture.close()
+    return elapsed / frames * 1e3, "ms/frame", False
+
+
+def benchmarks():
+    suite = {}
+    for n_envs in ENV_COUNTS:
+        suite[f"dodge_env/n_envs={n_envs}"] = lambda n=n_envs: bench_dodge_env(n)
+    for n_envs in VEC_ENV_COUNTS:
+        suite[f"dodge_vec_env/n_envs={n_envs}"] = lambda n=n_envs: bench_dodge_vec_env(n)
+    for n_envs in VEC_ENV_COUNTS:
+        suite[f"self_play_env/n_envs={n_envs}"] = lambda n=n_envs: bench_self_play_env(n)
+    suite["game_update"] = bench_game_update
+    for spec in ("heuristic", "planner"):
+        suite[f"player_update/{spec}"] = lambda s=spec: bench_player_update(s)
+    for density in DENSITIES:
+        suite[f"ai_decision/objects={density}"] = lambda d=density: bench_ai_decision(d)
+        suite[f"trained_ai_update/objects={density}"] = lambda d=density: bench_trained_ai_update(d)
+        suite[f"render/objects={density}"] = lambda d=density: bench_render(d)
+    for count in STORM_COUNTS:
+        suite[f"storm_frame/objects={count}"] = lambda c=count: bench_storm_frame(c)
+    suite["capture_frame"] = bench_capture_frame
+    return suite
+
+
+def run_suite(selected=None, repeat=3):
+    results = {}
+    for name, bench in benchmarks().items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        samples = []
+        unit = higher_is_better = None
+        details = {}
+        for _ in range(repeat):
+            outcome = bench()
+            if outcome is None:
+                break
+            # An optional fourth element carries extra details, e.g. object pool stats
+            value, unit, higher_is_better, *extra = outcome
+            samples.append(value)
+            if extra:
+                details = extra[0]
+        if not samples:
+            print(f"{name:40s} skipped")
+            continue
+        value = statistics.median(samples)
+        results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better, "samples": samples,
+                         **details}
+        print(f"{name:40s} {value:12.2f} {unit}")
+        if "allocation_stats" in details:
+            stats = details["allocation_stats"]
+            print(f"{'':40s} object pool: {stats['allocations']} allocated, {stats['reuses']} reuses")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]["value"], result["value"]
+        change = (new - old) / old if old else 0.0
+        if not result["higher_is_better"]:
+            change = -change
+        status = "REGRESSION" if change < -tolerance else "ok"
+        if status == "REGRESSION":
+            regressions.append(name)
+        print(f"{name:40s} {old:12.2f} -> {new:12.2f} {result['unit']:12s} {change:+7.1%} {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded performance benchmarks")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a previous results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before flagging (default: 0.10)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the median is reported")
+    parser.add_argument("--only", nargs="*", help="only run benchmarks whose name contains one of these strings")
+    args = parser.parse_args()
+
+    results = run_suite(args.only, args.repeat)
+    report = {
+        "meta": {
+            "seed": SEED,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print(f"\nComparison against {args.compare} (tolerance {args.tolerance:.0%}):")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
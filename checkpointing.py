@@ -0,0 +1,223 @@
+import glob
+import io
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+CHECKPOINT_FREQ = 50000
+CHECKPOINT_KEEP = 3
+CHECKPOINT_DIR = "models/checkpoints"
+CHECKPOINT_NAME = "dodge_game_ppo"
+BEST_MODEL_PATH = "models/dodge_game_ppo_best"
+CHECKPOINT_EVAL_MATCHES = 20
+CHECKPOINT_EVAL_MAX_TICKS = 5000
+
+
+def atomic_write(path, data):
+    # Readers see the old file or the complete new one, never a partial write
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    # The rename itself only survives a crash once the directory is synced
+    if hasattr(os, "O_DIRECTORY"):
+        directory = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def checkpoint_path(directory, name, timesteps):
+    return os.path.join(directory, f"{name}_{timesteps}")
+
+
+def latest_checkpoint(directory=CHECKPOINT_DIR, name=CHECKPOINT_NAME):
+    # Path without extension of the newest checkpoint, or None
+    paths = glob.glob(os.path.join(directory, f"{name}_*.zip"))
+    if not paths:
+        return None
+    newest = max(paths, key=lambda path: int(path[:-len(".zip")].rsplit("_", 1)[1]))
+    return newest[:-len(".zip")]
+
+
+class CheckpointWriter(threading.Thread):
+    # Writes serialized snapshots off the training thread, deletes all but the
+    # newest `keep`, and hands each finished checkpoint to the evaluator
+    def __init__(self, directory, name, keep, evaluations=None):
+        super().__init__(name="checkpoint-writer", daemon=True)
+        self.directory = directory
+        self.name = name
+        self.keep = keep
+        self.evaluations = evaluations
+        self.snapshots = queue.Queue(maxsize=2)
+        self.written = []
+        self.dropped = 0
+
+    def submit(self, timesteps, model_bytes, policy_bytes):
+        # Never blocks the learner: with two snapshots already waiting, this one is dropped
+        try:
+            self.snapshots.put_nowait((timesteps, model_bytes, policy_bytes))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            snapshot = self.snapshots.get()
+            if snapshot is None:
+                return
+            timesteps, model_bytes, policy_bytes = snapshot
+            path = checkpoint_path(self.directory, self.name, timesteps)
+            atomic_write(f"{path}.zip", model_bytes)
+            atomic_write(f"{path}.npz", policy_bytes)
+            self.written.append(path)
+            while len(self.written) > self.keep:
+                old = self.written.pop(0)
+                for extension in (".zip", ".npz"):
+                    if os.path.exists(old + extension):
+                        os.remove(old + extension)
+            if self.evaluations is not None:
+                self.evaluations.put((timesteps, path))
+
+    def close(self):
+        self.snapshots.put(None)
+        self.join()
+
+
+def evaluate_checkpoints(evaluations, results, best_path, matches, max_ticks, log_path):
+    # Evaluator process: scores each checkpoint in seeded games against the
+    # heuristic AI and writes the best one so far to best_path. Runs at low
+    # priority so the learner and its env workers keep their CPU time.
+    from evaluate import score_policy
+    from numpy_policy import load_numpy_policy
+    if hasattr(os, "nice"):
+        os.nice(10)
+
+    best_score = -1.0
+    if os.path.exists(f"{best_path}.json"):
+        with open(f"{best_path}.json") as f:
+            best_score = json.load(f)["mean_survival"]
+
+    while True:
+        job = evaluations.get()
+        if job is None:
+            return
+        timesteps, path = job
+        # Both files are read before scoring, so a checkpoint the writer rotates
+        # away meanwhile can still be promoted as a matching pair
+        try:
+            model_bytes = read_bytes(f"{path}.zip")
+            policy_bytes = read_bytes(f"{path}.npz")
+        except FileNotFoundError:
+            # Rotated away before its turn came; a newer checkpoint is queued
+            continue
+        started = time.perf_counter()
+        score, win_rate = score_policy(load_numpy_policy(io.BytesIO(policy_bytes)), matches, max_ticks)
+        result = {"timesteps": timesteps, "path": path, "mean_survival": score, "win_rate": win_rate,
+                  "seconds": time.perf_counter() - started, "best": False}
+
+        if score > best_score:
+            best_score = score
+            result["best"] = True
+            # The .json goes last: it names the checkpoint the .zip and .npz came from
+            atomic_write(f"{best_path}.zip", model_bytes)
+            atomic_write(f"{best_path}.npz", policy_bytes)
+            atomic_write(f"{best_path}.json", json.dumps(result, indent=2).encode())
+
+        with open(log_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        results.put(result)
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    # Every save_freq timesteps, serializes the model and its NumPy policy into
+    # memory on the training thread. The CheckpointWriter thread writes the
+    # files and an evaluator process scores them while training continues.
+    def __init__(self, save_freq=CHECKPOINT_FREQ, directory=CHECKPOINT_DIR, name=CHECKPOINT_NAME,
+                 best_path=BEST_MODEL_PATH, keep=CHECKPOINT_KEEP, action_repeat=1,
+                 eval_matches=CHECKPOINT_EVAL_MATCHES, eval_max_ticks=CHECKPOINT_EVAL_MAX_TICKS, verbose=0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.directory = directory
+        self.name = name
+        self.best_path = best_path
+        self.keep = keep
+        self.action_repeat = action_repeat
+        self.eval_matches = eval_matches
+        self.eval_max_ticks = eval_max_ticks
+        self.last_save = 0
+        self.writer = None
+        self.evaluator = None
+        self.evaluations = None
+        self.results = None
+
+    def _on_training_start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.last_save = self.num_timesteps
+        # Started before the writer thread, which the forked evaluator has no use for
+        if self.eval_matches > 0:
+            context = mp.get_context()
+            self.evaluations = context.Queue()
+            self.results = context.Queue()
+            self.evaluator = context.Process(
+                target=evaluate_checkpoints, name="checkpoint-evaluator", daemon=True,
+                args=(self.evaluations, self.results, self.best_path, self.eval_matches, self.eval_max_ticks,
+                      os.path.join(self.directory, "evaluations.jsonl")))
+            self.evaluator.start()
+        self.writer = CheckpointWriter(self.directory, self.name, self.keep, self.evaluations)
+        self.writer.start()
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        self.log_results()
+        if self.num_timesteps - self.last_save >= self.save_freq:
+            self.last_save = self.num_timesteps
+            self.snapshot()
+
+    def snapshot(self):
+        from numpy_policy import model_policy_arrays
+        started = time.perf_counter()
+        model_bytes = io.BytesIO()
+        self.model.save(model_bytes)
+        policy_bytes = io.BytesIO()
+        np.savez(policy_bytes, action_repeat=np.array(self.action_repeat), **model_policy_arrays(self.model))
+        self.writer.submit(self.num_timesteps, model_bytes.getvalue(), policy_bytes.getvalue())
+        self.logger.record("checkpoint/serialize_ms", (time.perf_counter() - started) * 1e3)
+        self.logger.record("checkpoint/dropped", self.writer.dropped)
+
+    def log_results(self):
+        while self.results is not None:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self.logger.record("eval/mean_survival", result["mean_survival"])
+            self.logger.record("eval/win_rate", result["win_rate"])
+            if result["best"]:
+                print(f"New best checkpoint at {result['timesteps']} timesteps: "
+                      f"mean survival {result['mean_survival']:.0f} ticks")
+
+    def _on_training_end(self):
+        # A final checkpoint, then wait for it to be written and scored
+        if self.num_timesteps > self.last_save:
+            self.last_save = self.num_timesteps
+            self.snapshot()
+        self.writer.close()
+        if self.evaluator is not None:
+            self.evaluations.put(None)
+            self.evaluator.join()
+            self.log_results()
@@ -1,6 +1,8 @@
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
 FPS = 60
+SIMULATION_TICK_RATE = 60
+MAX_FRAME_TIME = 0.25
 
 PLAYER_WIDTH = 50
 PLAYER_HEIGHT = 50
@@ -11,6 +13,7 @@ OBJECT_MAX_SIZE = 60
 OBJECT_MIN_SPEED = 2
 OBJECT_MAX_SPEED = 6
 OBJECT_SPAWN_RATE = 60
+OBJECT_POOL_CAPACITY = 64
 
 BACKGROUND_COLOR = (15, 23, 42)
 PLAYER1_COLOR = (34, 197, 94)
@@ -20,3 +23,8 @@ TEXT_COLOR = (248, 250, 252)
 
 AI_REACTION_DISTANCE = 200
 AI_PREDICTION_LOOKAHEAD = 30
+AI_ZONE_WIDTH = 10
+
+# Storm stress mode: objects spawned per tick at each (tick, rate) point, linear in between
+STORM_MAX_OBJECTS = 8000
+STORM_SPAWN_CURVE = ((0, 10.0), (600, 40.0))
@@ -0,0 +1,281 @@
+import argparse
+import itertools
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import sys
+import time
+import numpy as np
+from config import *
+from simulation import World, collision_winner
+
+EVAL_MATCHES = 1000
+EVAL_MAX_TICKS = 20000
+EVAL_SEED = 0
+LEFT_X = 100
+RIGHT_X = SCREEN_WIDTH - 150
+PLAYER_Y = SCREEN_HEIGHT - 100
+BUILTIN_ENTRANTS = ("heuristic", "reference", "planner")
+
+_entrants = {}
+
+
+def entrant_names(specs):
+    names = [os.path.basename(spec) for spec in specs]
+    return [spec if names.count(name) > 1 else name for name, spec in zip(names, specs)]
+
+
+def make_player(spec, x):
+    # "heuristic" and "reference" are the scripted AIPlayer modes, "planner" is
+    # PlannerAIPlayer, "unix:PATH" asks an inference server over one connection
+    # per process, another string is a .zip or .npz checkpoint loaded once per
+    # process, and anything else is an already loaded policy
+    from trained_ai_player import TrainedAIPlayer
+    if not isinstance(spec, str):
+        return TrainedAIPlayer(x, PLAYER_Y, spec)
+    if spec in ("heuristic", "reference"):
+        from ai_player import AIPlayer
+        return AIPlayer(x, PLAYER_Y, mode="vectorized" if spec == "heuristic" else "reference")
+    if spec == "planner":
+        from planner_ai_player import PlannerAIPlayer
+        return PlannerAIPlayer(x, PLAYER_Y)
+
+    model = _entrants.get(spec)
+    if model is None and spec.startswith("unix:"):
+        from inference_server import InferenceClient
+        model = _entrants[spec] = InferenceClient(spec[len("unix:"):])
+    elif model is None:
+        from numpy_policy import load_policy
+        model = _entrants[spec] = load_policy(spec)
+    return TrainedAIPlayer(x, PLAYER_Y, model)
+
+
+def play_match(left_spec, right_spec, seed, max_ticks=EVAL_MAX_TICKS):
+    # Same tick order and collision rule as Game.update. The winner is decided
+    # at the first hit; the survivor keeps playing so both survival times are known.
+    world = World(rng=random.Random(seed))
+    players = [make_player(left_spec, LEFT_X), make_player(right_spec, RIGHT_X)]
+    survival = [None, None]
+    winner = None
+
+    while world.frame_count < max_ticks and None in survival:
+        world.spawn()
+        for player in players:
+            if player.alive:
+                player.update(world.falling_objects)
+        world.advance()
+
+        hits = [world.first_collision(*player.rect, snap_to_pixels=True) if player.alive else -1
+                for player in players]
+        if winner is None:
+            winner = collision_winner(*hits)
+        for index, hit in enumerate(hits):
+            if hit >= 0:
+                players[index].alive = False
+                survival[index] = world.frame_count
+
+    survival = [ticks if ticks is not None else world.frame_count for ticks in survival]
+    return winner, survival
+
+
+def score_policy(spec, matches, max_ticks=EVAL_MAX_TICKS, opponent="heuristic", seed=EVAL_SEED):
+    # Mean survival and win rate of one entrant against `opponent` in seeded matches, sides swapped per seed
+    survival = []
+    wins = 0.0
+    for match in range(matches):
+        if match % 2:
+            winner, ticks = play_match(opponent, spec, seed + match // 2, max_ticks)
+            winner = None if winner is None else 1 - winner
+            ticks.reverse()
+        else:
+            winner, ticks = play_match(spec, opponent, seed + match // 2, max_ticks)
+        survival.append(ticks[0])
+        wins += 0.5 if winner is None else float(winner == 0)
+    return float(np.mean(survival)), wins / matches
+
+
+def _play(job):
+    first, second, seed, swapped, max_ticks = job
+    specs = _specs
+    if swapped:
+        winner, survival = play_match(specs[second], specs[first], seed, max_ticks)
+        winner = None if winner is None else 1 - winner
+        survival.reverse()
+    else:
+        winner, survival = play_match(specs[first], specs[second], seed, max_ticks)
+    return first, second, winner, survival
+
+
+def _init_worker(specs):
+    global _specs
+    _specs = specs
+
+
+def make_jobs(entrant_count, matches, seed, max_ticks):
+    # Each seed is played twice with the sides swapped, so neither entrant
+    # gets the better starting position more often
+    jobs = []
+    for first, second in itertools.combinations(range(entrant_count), 2):
+        for match in range(matches):
+            jobs.append((first, second, seed + match // 2, match % 2 == 1, max_ticks))
+    return jobs
+
+
+def run_matches(specs, matches=EVAL_MATCHES, workers=None, seed=EVAL_SEED, max_ticks=EVAL_MAX_TICKS):
+    workers = workers or os.cpu_count() or 1
+    jobs = make_jobs(len(specs), matches, seed, max_ticks)
+    if workers == 1:
+        _init_worker(specs)
+        return [_play(job) for job in jobs]
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with mp.get_context().Pool(workers, initializer=_init_worker, initargs=(specs,)) as pool:
+        return pool.map(_play, jobs, chunksize=chunksize)
+
+
+def wilson_interval(wins, games, z=1.96):
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    denominator = 1 + z * z / games
+    center = (rate + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return center - margin, center + margin
+
+
+def survival_stats(ticks):
+    ticks = np.asarray(ticks, dtype=np.float64)
+    return {
+        "mean": float(ticks.mean()),
+        "p10": float(np.percentile(ticks, 10)),
+        "median": float(np.median(ticks)),
+        "p90": float(np.percentile(ticks, 90)),
+    }
+
+
+def summarize(specs, results):
+    # Draws (nobody hit before max_ticks) count as half a win each
+    names = entrant_names(specs)
+    entrants = [{"name": name, "spec": spec, "wins": 0.0, "games": 0, "survival": []}
+                for name, spec in zip(names, specs)]
+    matchups = {}
+
+    for first, second, winner, survival in results:
+        matchup = matchups.setdefault((first, second), {"wins": 0.0, "draws": 0, "games": 0, "survival": ([], [])})
+        matchup["games"] += 1
+        if winner is None:
+            matchup["draws"] += 1
+            first_score = 0.5
+        else:
+            first_score = 1.0 if winner == 0 else 0.0
+        matchup["wins"] += first_score
+        for index, score in ((first, first_score), (second, 1 - first_score)):
+            entrants[index]["wins"] += score
+            entrants[index]["games"] += 1
+        entrants[first]["survival"].append(survival[0])
+        entrants[second]["survival"].append(survival[1])
+        matchup["survival"][0].append(survival[0])
+        matchup["survival"][1].append(survival[1])
+
+    report = {"entrants": [], "matchups": []}
+    for entrant in entrants:
+        low, high = wilson_interval(entrant["wins"], entrant["games"])
+        report["entrants"].append({
+            "name": entrant["name"],
+            "spec": entrant["spec"],
+            "games": entrant["games"],
+            "win_rate": entrant["wins"] / max(entrant["games"], 1),
+            "ci95": [low, high],
+            "survival": survival_stats(entrant["survival"]),
+        })
+    for (first, second), matchup in matchups.items():
+        low, high = wilson_interval(matchup["wins"], matchup["games"])
+        report["matchups"].append({
+            "first": names[first],
+            "second": names[second],
+            "games": matchup["games"],
+            "draws": matchup["draws"],
+            "first_win_rate": matchup["wins"] / matchup["games"],
+            "ci95": [low, high],
+            "first_survival": survival_stats(matchup["survival"][0]),
+            "second_survival": survival_stats(matchup["survival"][1]),
+        })
+    return report
+
+
+def print_report(report):
+    print(f"\n{'entrant':24s} {'games':>6s} {'win rate':>9s} {'95% CI':>16s} "
+          f"{'survival mean':>14s} {'p10':>7s} {'median':>7s} {'p90':>7s}")
+    for entrant in report["entrants"]:
+        survival = entrant["survival"]
+        print(f"{entrant['name']:24s} {entrant['games']:6d} {entrant['win_rate']:9.1%} "
+              f"{entrant['ci95'][0]:7.1%} - {entrant['ci95'][1]:6.1%} "
+              f"{survival['mean']:14.0f} {survival['p10']:7.0f} {survival['median']:7.0f} {survival['p90']:7.0f}")
+
+    print(f"\n{'matchup':40s} {'games':>6s} {'draws':>6s} {'first wins':>11s} {'95% CI':>16s} {'median ticks':>13s}")
+    for matchup in report["matchups"]:
+        label = f"{matchup['first']} vs {matchup['second']}"
+        medians = f"{matchup['first_survival']['median']:.0f}/{matchup['second_survival']['median']:.0f}"
+        print(f"{label:40s} {matchup['games']:6d} {matchup['draws']:6d} {matchup['first_win_rate']:11.1%} "
+              f"{matchup['ci95'][0]:7.1%} - {matchup['ci95'][1]:6.1%} {medians:>13s}")
+
+
+def gate_failures(report, threshold):
+    # The first entrant has to beat every other one with its whole CI above the threshold
+    candidate = report["entrants"][0]["name"]
+    return [matchup["second"] for matchup in report["matchups"]
+            if matchup["first"] == candidate and matchup["ci95"][0] < threshold]
+
+
+def main():
+    default_model = "models/dodge_game_ppo.npz"
+    parser = argparse.ArgumentParser(description="Headless tournament between AI players")
+    parser.add_argument("entrants", nargs="*",
+                        help="'heuristic', 'reference', 'planner', 'unix:SOCKET' for an inference server, "
+                             "or a model checkpoint (.zip/.npz); "
+                             f"default: heuristic and {default_model}")
+    parser.add_argument("--matches", type=int, default=EVAL_MATCHES, help=f"matches per pairing (default: {EVAL_MATCHES})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU core)")
+    parser.add_argument("--seed", type=int, default=EVAL_SEED, help="first match seed")
+    parser.add_argument("--max-ticks", type=int, default=EVAL_MAX_TICKS, help="ticks before a match counts as a draw")
+    parser.add_argument("--output", default=None, help="write the full report as JSON")
+    parser.add_argument("--gate", type=float, default=None, metavar="WIN_RATE",
+                        help="exit with status 1 unless the first entrant's win-rate CI against "
+                             "every other entrant lies above WIN_RATE")
+    args = parser.parse_args()
+
+    specs = args.entrants or ["heuristic", default_model]
+    if len(specs) < 2:
+        parser.error("need at least two entrants")
+    for spec in specs:
+        if spec not in BUILTIN_ENTRANTS and not spec.startswith("unix:") and not os.path.exists(spec):
+            parser.error(f"checkpoint not found: {spec}")
+
+    pairings = len(specs) * (len(specs) - 1) // 2
+    print(f"Playing {pairings * args.matches} matches between {len(specs)} entrants...")
+    started = time.perf_counter()
+    results = run_matches(specs, args.matches, args.workers, args.seed, args.max_ticks)
+    elapsed = time.perf_counter() - started
+    ticks = sum(max(survival) for _, _, _, survival in results)
+    print(f"Finished in {elapsed:.1f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+
+    report = summarize(specs, results)
+    report["meta"] = {"matches": args.matches, "seed": args.seed, "max_ticks": args.max_ticks, "seconds": elapsed}
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.gate is not None:
+        failures = gate_failures(report, args.gate)
+        if failures:
+            print(f"\nGate failed: {report['entrants'][0]['name']} is not above {args.gate:.0%} against {', '.join(failures)}")
+            sys.exit(1)
+        print(f"\nGate passed: {report['entrants'][0]['name']} is above {args.gate:.0%} against every opponent")
+
+
+if __name__ == "__main__":
+    main()
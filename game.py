@@ -1,74 +1,177 @@
+import os
 import pygame
+import random
 import sys
+import time
 from config import *
 from falling_object import FallingObject
 from player import ManualPlayer
 from ai_player import AIPlayer
+from simulation import World, collision_winner, object_arrays
+from renderer import TextCache, DirtyRects, draw_objects
+from profiler import FrameProfiler
 
 class Game:
-    def __init__(self, use_trained_ai=False, trained_model=None):
+    def __init__(self, use_trained_ai=False, trained_model=None, model_loader=None, started_at=None,
+                 speed=1.0, turbo=False, headless=False, ai_vs_ai=False, max_matches=None, seed=None,
+                 record_path=None, profile=False, profile_trace=None, use_planner_ai=False,
+                 storm=False, storm_objects=STORM_MAX_OBJECTS, storm_curve=STORM_SPAWN_CURVE, capture_path=None):
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.startup_times = {}
+        self.speed = speed
+        self.turbo = turbo or headless
+        self.headless = headless
+        self.ai_vs_ai = ai_vs_ai
+        self.max_matches = max_matches
+        self.results = []
+        self.recorder = None
+        if record_path is not None:
+            from replay import ReplayRecorder
+            self.recorder = ReplayRecorder(record_path)
+        self.profiler = FrameProfiler(enabled=profile or profile_trace is not None)
+        self.profile_trace = profile_trace
+        self.show_profile = profile
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.capture = None
+        if capture_path is not None:
+            from video_capture import VideoCapture
+            # Headless runs have no frame deadline, so they wait for the writer instead of dropping frames
+            self.capture = VideoCapture(capture_path, self.screen, drop_frames=not headless)
         self.use_trained_ai = use_trained_ai
+        self.use_planner_ai = use_planner_ai
         self.trained_model = trained_model
-
-        if use_trained_ai:
-            pygame.display.set_caption("Falling Objects - Trained AI vs Human")
-        else:
-            pygame.display.set_caption("Falling Objects - Heuristic AI vs Human")
+        self.model_loader = model_loader
+        self.set_caption()
 
         self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 48)
         self.small_font = pygame.font.Font(None, 32)
+        self.profile_font = pygame.font.Font(None, 22)
+        self.text_cache = TextCache()
+        self.dirty_rects = DirtyRects()
+        self.drawn_screen = None
         self.state = "menu"
+        if storm:
+            from storm import StormWorld
+            self.world = StormWorld(max_objects=storm_objects, spawn_curve=storm_curve, seed=seed)
+        else:
+            self.world = World(object_factory=FallingObject, rng=random.Random(seed) if seed is not None else None)
         self.reset_game()
 
+    def set_caption(self):
+        if self.use_trained_ai:
+            pygame.display.set_caption("Falling Objects - Trained AI vs Human")
+        elif self.use_planner_ai:
+            pygame.display.set_caption("Falling Objects - Planner AI vs Human")
+        else:
+            pygame.display.set_caption("Falling Objects - Heuristic AI vs Human")
+
+    @property
+    def model_loading(self):
+        return self.model_loader is not None and not self.model_loader.done
+
+    def poll_model_loader(self):
+        if self.model_loader is None or not self.model_loader.done:
+            return
+
+        loader = self.model_loader
+        self.model_loader = None
+        self.startup_times["model_ready"] = loader.ready_at - self.started_at
+        print(f"Startup: model ready after {self.startup_times['model_ready'] * 1000:.0f} ms")
+
+        if loader.failed:
+            print("\nFalling back to heuristic AI...")
+            self.use_trained_ai = False
+            self.set_caption()
+        else:
+            self.trained_model = loader.model
+
+        if self.state == "menu":
+            self.reset_game()
+
     def reset_game(self):
-        self.manual_player = ManualPlayer(100, SCREEN_HEIGHT - 100)
+        if self.ai_vs_ai:
+            self.manual_player = AIPlayer(100, SCREEN_HEIGHT - 100)
+            self.manual_player.color = PLAYER1_COLOR
+        else:
+            self.manual_player = ManualPlayer(100, SCREEN_HEIGHT - 100)
 
         if self.use_trained_ai:
             from trained_ai_player import TrainedAIPlayer
             self.ai_player = TrainedAIPlayer(SCREEN_WIDTH - 150, SCREEN_HEIGHT - 100, self.trained_model)
+        elif self.use_planner_ai:
+            from planner_ai_player import PlannerAIPlayer
+            self.ai_player = PlannerAIPlayer(SCREEN_WIDTH - 150, SCREEN_HEIGHT - 100)
         else:
             self.ai_player = AIPlayer(SCREEN_WIDTH - 150, SCREEN_HEIGHT - 100)
 
-        self.falling_objects = []
-        self.frame_count = 0
+        self.world.reset()
         self.winner = None
+        if self.recorder is not None and self.state == "playing":
+            self.recorder.start_match()
 
-    def spawn_object(self):
-        if self.frame_count % OBJECT_SPAWN_RATE == 0:
-            self.falling_objects.append(FallingObject())
+    @property
+    def falling_objects(self):
+        return self.world.falling_objects
 
     def check_collisions(self):
-        for obj in self.falling_objects:
-            if self.manual_player.alive and self.manual_player.rect.colliderect(obj.rect):
-                self.manual_player.alive = False
-                self.winner = "AI Player"
-                self.state = "game_over"
+        manual_hit = self.world.first_collision(*self.manual_player.rect, snap_to_pixels=True)
+        ai_hit = self.world.first_collision(*self.ai_player.rect, snap_to_pixels=True)
+
+        winner = collision_winner(manual_hit, ai_hit)
+        if winner is None:
+            return
+
+        if manual_hit >= 0:
+            self.manual_player.alive = False
+        if ai_hit >= 0:
+            self.ai_player.alive = False
 
-            if self.ai_player.alive and self.ai_player.rect.colliderect(obj.rect):
-                self.ai_player.alive = False
-                self.winner = "Manual Player"
-                self.state = "game_over"
+        self.winner = "AI Player" if winner == 1 else "Manual Player"
+        self.state = "game_over"
 
     def update(self):
         if self.state != "playing":
             return
 
-        self.frame_count += 1
-        self.spawn_object()
+        profiler = self.profiler
+        self.manual_player.previous_x = self.manual_player.x
+        self.ai_player.previous_x = self.ai_player.x
 
-        keys = pygame.key.get_pressed()
-        self.manual_player.handle_input(keys)
-        self.ai_player.update(self.falling_objects)
+        self.world.spawn()
+        profiler.mark("spawn")
 
-        for obj in self.falling_objects:
-            obj.update()
+        if self.ai_vs_ai:
+            self.manual_player.update(self.falling_objects)
+        else:
+            keys = pygame.key.get_pressed()
+            self.manual_player.handle_input(keys)
+        profiler.mark("input")
+        self.ai_player.update(self.falling_objects)
+        profiler.mark("ai")
 
-        self.falling_objects = [obj for obj in self.falling_objects if not obj.is_off_screen()]
+        self.world.advance()
+        profiler.mark("objects")
 
         self.check_collisions()
+        profiler.mark("collisions")
+
+        if self.recorder is not None:
+            self.recorder.record(self.world.frame_count, self.manual_player, self.ai_player, self.falling_objects)
+            profiler.mark("record")
+
+    def capture_frame(self):
+        self.capture.capture(self.screen)
+        self.profiler.mark("capture")
+
+    def menu_prompt(self):
+        if self.model_loading:
+            dots = "." * (int(time.perf_counter() * 3) % 3 + 1)
+            return f"Loading AI model{dots:<3}", (150, 150, 150)
+        return "Press SPACE to Start", PLAYER1_COLOR
 
     def draw_menu(self):
         self.screen.fill(BACKGROUND_COLOR)
@@ -79,6 +182,8 @@ class Game:
 
         if self.use_trained_ai:
             subtitle = self.small_font.render("Trained Deep AI vs Human", True, (100, 200, 150))
+        elif self.use_planner_ai:
+            subtitle = self.small_font.render("Planner AI vs Human", True, (200, 150, 100))
         else:
             subtitle = self.small_font.render("Heuristic AI vs Human", True, (100, 150, 200))
         subtitle_rect = subtitle.get_rect(center=(SCREEN_WIDTH // 2, 260))
@@ -92,7 +197,8 @@ class Game:
         instruction2_rect = instruction2.get_rect(center=(SCREEN_WIDTH // 2, 450))
         self.screen.blit(instruction2, instruction2_rect)
 
-        start = self.small_font.render("Press SPACE to Start", True, PLAYER1_COLOR)
+        prompt, prompt_color = self.menu_prompt()
+        start = self.small_font.render(prompt, True, prompt_color)
         start_rect = start.get_rect(center=(SCREEN_WIDTH // 2, 550))
         self.screen.blit(start, start_rect)
 
@@ -122,33 +228,74 @@ class Game:
         quit_rect = quit_text.get_rect(center=(SCREEN_WIDTH // 2, 550))
         self.screen.blit(quit_text, quit_rect)
 
-    def draw_playing(self):
-        self.screen.fill(BACKGROUND_COLOR)
-
-        for obj in self.falling_objects:
-            obj.draw(self.screen)
-
-        self.manual_player.draw(self.screen)
-        self.ai_player.draw(self.screen)
-
-        manual_label = self.small_font.render("You", True, PLAYER1_COLOR)
-        self.screen.blit(manual_label, (self.manual_player.x - 10, self.manual_player.y - 30))
-
-        ai_label = self.small_font.render("AI", True, PLAYER2_COLOR)
-        self.screen.blit(ai_label, (self.ai_player.x + 10, self.ai_player.y - 30))
-
-        objects_text = self.small_font.render(f"Objects: {len(self.falling_objects)}", True, TEXT_COLOR)
-        self.screen.blit(objects_text, (10, 10))
-
-    def draw(self):
+    def draw_playing(self, alpha=1.0):
+        self.dirty_rects.erase(self.screen)
+
+        if self.falling_objects:
+            obj_x, obj_y, obj_size, obj_speed = object_arrays(self.falling_objects)
+            doreturn = self.dirty_rects.wants_rects(len(obj_x))
+            rects = draw_objects(self.screen, obj_x, obj_y - obj_speed * (1.0 - alpha), obj_size, doreturn)
+            if doreturn:
+                self.dirty_rects.extend(rects)
+            else:
+                self.dirty_rects.cover_screen()
+
+        manual_rect = self.manual_player.draw(self.screen, alpha)
+        ai_rect = self.ai_player.draw(self.screen, alpha)
+        self.dirty_rects.add(manual_rect)
+        self.dirty_rects.add(ai_rect)
+
+        manual_label = self.text_cache.render(self.small_font, "AI 1" if self.ai_vs_ai else "You", PLAYER1_COLOR)
+        self.dirty_rects.add(self.screen.blit(manual_label, (manual_rect.x - 10, self.manual_player.y - 30)))
+
+        ai_label = self.text_cache.render(self.small_font, "AI", PLAYER2_COLOR)
+        self.dirty_rects.add(self.screen.blit(ai_label, (ai_rect.x + 10, self.ai_player.y - 30)))
+
+        objects_text = self.text_cache.render(self.small_font, f"Objects: {len(self.falling_objects)}", TEXT_COLOR)
+        self.dirty_rects.add(self.screen.blit(objects_text, (10, 10)))
+
+        if self.show_profile:
+            self.draw_profile_overlay()
+
+    def draw_profile_overlay(self):
+        y = 40
+        for name, (p50, p99) in self.profiler.cached_stats().items():
+            line = f"{name}: p50 {p50:.2f} ms  p99 {p99:.2f} ms"
+            text = self.text_cache.render(self.profile_font, line, (150, 150, 150))
+            self.dirty_rects.add(self.screen.blit(text, (10, y)))
+            y += 18
+
+    def draw(self, alpha=1.0):
+        # Menu and game-over screens are static, so they are only redrawn when their content changes
         if self.state == "menu":
-            self.draw_menu()
-        elif self.state == "playing":
-            self.draw_playing()
+            screen_key = ("menu", self.use_trained_ai, self.menu_prompt())
         elif self.state == "game_over":
-            self.draw_game_over()
-
-        pygame.display.flip()
+            screen_key = ("game_over", self.winner)
+        else:
+            screen_key = ("playing",)
+
+        if screen_key == ("playing",) and self.drawn_screen == screen_key:
+            self.draw_playing(alpha)
+            self.profiler.mark("draw")
+            self.dirty_rects.present()
+            self.profiler.mark("flip")
+        elif screen_key != self.drawn_screen:
+            self.dirty_rects.reset()
+            if self.state == "menu":
+                self.draw_menu()
+            elif self.state == "playing":
+                self.screen.fill(BACKGROUND_COLOR)
+                self.draw_playing(alpha)
+            elif self.state == "game_over":
+                self.draw_game_over()
+            self.profiler.mark("draw")
+            self.dirty_rects.present(full=True)
+            self.profiler.mark("flip")
+            self.drawn_screen = screen_key
+
+        if "first_frame" not in self.startup_times:
+            self.startup_times["first_frame"] = time.perf_counter() - self.started_at
+            print(f"Startup: first frame after {self.startup_times['first_frame'] * 1000:.0f} ms")
 
     def handle_events(self):
         for event in pygame.event.get():
@@ -159,7 +306,14 @@ class Game:
                 if event.key == pygame.K_ESCAPE:
                     return False
 
+                if event.key == pygame.K_F3:
+                    self.show_profile = not self.show_profile
+                    if self.show_profile:
+                        self.profiler.enable()
+
                 if event.key == pygame.K_SPACE:
+                    if self.state == "menu" and self.model_loading:
+                        continue
                     if self.state == "menu":
                         self.state = "playing"
                         self.reset_game()
@@ -169,13 +323,90 @@ class Game:
 
         return True
 
+    def auto_play(self):
+        if self.state == "menu" and not self.model_loading:
+            self.state = "playing"
+            self.reset_game()
+        elif self.state == "game_over":
+            self.results.append((self.winner, self.world.frame_count))
+            if self.max_matches is not None and len(self.results) >= self.max_matches:
+                return False
+            self.state = "playing"
+            self.reset_game()
+        return True
+
+    def print_results(self, elapsed):
+        ticks = sum(frames for _, frames in self.results)
+        wins = {}
+        for winner, _ in self.results:
+            wins[winner] = wins.get(winner, 0) + 1
+        print(f"{len(self.results)} matches, {ticks} ticks in {elapsed:.1f}s ({ticks / max(elapsed, 1e-9):.0f} ticks/s)")
+        for winner, count in sorted(wins.items()):
+            print(f"  {winner}: {count} wins")
+        # Allocations stop growing once the pool covers the busiest moment
+        stats = self.world.allocation_stats()
+        print(f"Object pool: {stats['allocations']} allocated, {stats['reuses']} reuses, "
+              f"{stats['active']} active, {stats['free']} free")
+
     def run(self):
+        # Fixed-timestep loop: the simulation always advances in 1/SIMULATION_TICK_RATE
+        # steps, slow frames run several ticks to catch up, and rendering
+        # interpolates between the last two ticks.
+        tick_time = 1.0 / SIMULATION_TICK_RATE
+        accumulator = 0.0
+        previous = time.perf_counter()
+        run_started = previous
         running = True
-        while running:
-            running = self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
+        profiler = self.profiler
+
+        # The recording and video are finished even if the loop raises
+        try:
+            while running:
+                profiler.next_frame()
+                self.poll_model_loader()
+                running = self.handle_events()
+                profiler.mark("events")
+                if self.headless:
+                    running = running and self.auto_play()
+
+                now = time.perf_counter()
+                if self.turbo:
+                    # Run ticks as fast as possible, stopping only to render at most FPS frames/s
+                    deadline = now + 1.0 / FPS
+                    while self.state == "playing" and time.perf_counter() < deadline:
+                        self.update()
+                        if self.capture is not None and self.capture.wants_frame():
+                            # Every tick becomes a video frame, so the video plays back at normal speed
+                            self.draw()
+                            self.capture_frame()
+                    alpha = 1.0
+                else:
+                    accumulator += min(now - previous, MAX_FRAME_TIME) * self.speed
+                    while accumulator >= tick_time:
+                        self.update()
+                        accumulator -= tick_time
+                    alpha = accumulator / tick_time
+                previous = now
+
+                if not self.headless:
+                    self.draw(alpha)
+                    if self.capture is not None and not self.turbo and self.capture.wants_frame():
+                        self.capture_frame()
+                if not self.turbo or self.state != "playing":
+                    self.clock.tick(FPS)
+                    profiler.mark("wait")
+
+            if self.headless:
+                self.print_results(time.perf_counter() - run_started)
+        finally:
+            if self.recorder is not None:
+                self.recorder.close()
+            if self.capture is not None:
+                self.capture.close()
+        if self.profile_trace is not None:
+            profiler.summary()
+            events = profiler.export_chrome_trace(self.profile_trace)
+            print(f"Profile trace with {events} events written to {self.profile_trace}")
 
         pygame.quit()
         sys.exit()
@@ -0,0 +1,217 @@
+import argparse
+import os
+import selectors
+import socket
+import struct
+import sys
+import time
+import numpy as np
+
+INFERENCE_SOCKET = "/tmp/dodge_inference.sock"
+INFERENCE_MODEL = "models/dodge_game_ppo.zip"
+INFERENCE_BATCH_WINDOW = 0.001
+INFERENCE_DEADLINE = 0.004
+INFERENCE_STATS_INTERVAL = 10.0
+
+# Wire format, little endian. On connect the server sends HEADER
+# (observation size, action repeat). Each request is a sequence number
+# followed by the float32 observation; each reply is (sequence number, action).
+HEADER = struct.Struct("<II")
+REQUEST = struct.Struct("<I")
+REPLY = struct.Struct("<Ii")
+
+
+def recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("inference server closed the connection")
+        data += chunk
+    return data
+
+
+class InferenceServer:
+    # Loads the policy once and answers many games over a Unix socket. Requests
+    # that arrive within batch_window of the first pending one, or until every
+    # connected client is waiting, share one forward pass.
+    def __init__(self, model_path=INFERENCE_MODEL, socket_path=INFERENCE_SOCKET, batch_window=INFERENCE_BATCH_WINDOW):
+        from numpy_policy import load_policy
+        self.policy = load_policy(model_path)
+        self.socket_path = socket_path
+        self.batch_window = batch_window
+        self.request_size = REQUEST.size + 4 * self.policy.observation_size
+        self.selector = selectors.DefaultSelector()
+        self.buffers = {}
+        self.pending = []
+        self.first_pending_at = None
+        self.batches = 0
+        self.requests = 0
+
+    def listen(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        listener.listen()
+        self.selector.register(listener, selectors.EVENT_READ)
+        return listener
+
+    def accept(self, listener):
+        conn, _ = listener.accept()
+        conn.sendall(HEADER.pack(self.policy.observation_size, self.policy.action_repeat))
+        self.buffers[conn] = b""
+        self.selector.register(conn, selectors.EVENT_READ)
+
+    def disconnect(self, conn):
+        self.selector.unregister(conn)
+        del self.buffers[conn]
+        self.pending = [request for request in self.pending if request[0] is not conn]
+        conn.close()
+
+    def read(self, conn):
+        try:
+            data = conn.recv(65536)
+        except ConnectionError:
+            data = b""
+        if not data:
+            self.disconnect(conn)
+            return
+
+        buffer = self.buffers[conn] + data
+        complete = len(buffer) - len(buffer) % self.request_size
+        for offset in range(0, complete, self.request_size):
+            (sequence,) = REQUEST.unpack_from(buffer, offset)
+            observation = np.frombuffer(buffer, dtype=np.float32, count=self.policy.observation_size,
+                                        offset=offset + REQUEST.size)
+            self.pending.append((conn, sequence, observation))
+        self.buffers[conn] = buffer[complete:]
+        if self.pending and self.first_pending_at is None:
+            self.first_pending_at = time.perf_counter()
+
+    def ready(self):
+        if not self.pending:
+            return False
+        waiting = {request[0] for request in self.pending}
+        return (len(waiting) == len(self.buffers) or
+                time.perf_counter() - self.first_pending_at >= self.batch_window)
+
+    def flush(self):
+        pending, self.pending, self.first_pending_at = self.pending, [], None
+        actions, _ = self.policy.predict(np.stack([request[2] for request in pending]), deterministic=True)
+        for (conn, sequence, _), action in zip(pending, actions.tolist()):
+            try:
+                conn.sendall(REPLY.pack(sequence, action))
+            except OSError:
+                pass
+        self.batches += 1
+        self.requests += len(pending)
+
+    def serve_forever(self, stats_interval=INFERENCE_STATS_INTERVAL):
+        listener = self.listen()
+        print(f"Serving {self.policy.observation_size}-feature policy on {self.socket_path}")
+        stats_at = time.perf_counter() + stats_interval
+        try:
+            while True:
+                timeout = None
+                if self.first_pending_at is not None:
+                    timeout = max(self.first_pending_at + self.batch_window - time.perf_counter(), 0)
+                for key, _ in self.selector.select(timeout):
+                    if key.fileobj is listener:
+                        self.accept(listener)
+                    else:
+                        self.read(key.fileobj)
+                if self.ready():
+                    self.flush()
+
+                if stats_interval and time.perf_counter() >= stats_at and self.batches:
+                    print(f"{len(self.buffers)} clients, {self.requests / stats_interval:.0f} requests/s, "
+                          f"mean batch {self.requests / self.batches:.1f}")
+                    self.batches = self.requests = 0
+                    stats_at = time.perf_counter() + stats_interval
+        finally:
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+class InferenceClient:
+    # Stands in for a model in TrainedAIPlayer. A reply that misses the deadline
+    # is skipped and the previous action is held, so a slow server never stalls
+    # a frame; the late reply is discarded when it arrives.
+    def __init__(self, socket_path=INFERENCE_SOCKET, deadline=INFERENCE_DEADLINE):
+        self.deadline = deadline
+        self.conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.conn.connect(socket_path)
+        self.observation_size, self.action_repeat = HEADER.unpack(recv_exact(self.conn, HEADER.size))
+        # The socket stays blocking, so a send is never cut short and the request
+        # framing stays intact; only the wait for the reply has a deadline
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.conn, selectors.EVENT_READ)
+        self.sequence = 0
+        self.buffer = b""
+        self.last_action = 0
+        self.missed = 0
+        self.connected = True
+
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        if not self.connected:
+            return self.last_action, state
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        try:
+            self.conn.sendall(REQUEST.pack(self.sequence) + np.asarray(observation, dtype=np.float32).tobytes())
+            action = self.wait_for_reply(time.perf_counter() + self.deadline)
+        except OSError:
+            self.connected = False
+            action = None
+        if action is None:
+            self.missed += 1
+            return self.last_action, state
+        self.last_action = action
+        return action, state
+
+    def wait_for_reply(self, deadline):
+        while True:
+            while len(self.buffer) >= REPLY.size:
+                sequence, action = REPLY.unpack_from(self.buffer)
+                self.buffer = self.buffer[REPLY.size:]
+                if sequence == self.sequence:
+                    return action
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            if not self.selector.select(remaining):
+                return None
+            data = self.conn.recv(4096)
+            if not data:
+                raise ConnectionError("inference server closed the connection")
+            self.buffer += data
+
+    def close(self):
+        self.selector.close()
+        self.conn.close()
+        self.connected = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batching inference server for trained AI players")
+    parser.add_argument("model_path", nargs="?", default=INFERENCE_MODEL, help=f"policy checkpoint (default: {INFERENCE_MODEL})")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET, help=f"Unix socket path (default: {INFERENCE_SOCKET})")
+    parser.add_argument("--batch-window", type=float, default=INFERENCE_BATCH_WINDOW * 1e3,
+                        help="ms to wait for more requests before a forward pass")
+    parser.add_argument("--stats-interval", type=float, default=INFERENCE_STATS_INTERVAL,
+                        help="seconds between throughput lines, 0 to disable")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model_path):
+        print(f"Error: model not found at {args.model_path}")
+        sys.exit(1)
+    server = InferenceServer(args.model_path, args.socket, args.batch_window / 1e3)
+    try:
+        server.serve_forever(args.stats_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
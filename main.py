@@ -1,17 +1,54 @@
-import sys
-from game import Game
+import time
+STARTED_AT = time.perf_counter()
+
+import argparse
+from model_loader import ModelLoader
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Falling Objects - AI vs Human")
+    parser.add_argument("--use-trained-ai", action="store_true", help="play against the trained PPO model")
+    parser.add_argument("--inference-server", metavar="SOCKET", nargs="?", const="/tmp/dodge_inference.sock", default=None,
+                        help="play against the trained model through a running inference_server.py")
+    parser.add_argument("--planner-ai", action="store_true", help="play against the look-ahead planner AI")
+    parser.add_argument("--ai-vs-ai", action="store_true", help="replace the human player with a heuristic AI")
+    parser.add_argument("--speed", type=float, default=1.0, help="simulation speed multiplier, e.g. 10 for 10x")
+    parser.add_argument("--turbo", action="store_true", help="simulate as fast as possible, rendering at most FPS frames/s")
+    parser.add_argument("--headless", action="store_true", help="no window: play matches back to back as fast as possible")
+    parser.add_argument("--matches", type=int, default=None, help="stop after this many matches (headless mode)")
+    parser.add_argument("--seed", type=int, default=None, help="seed object spawning for reproducible matches")
+    parser.add_argument("--record", metavar="PATH", default=None, help="record every tick to a replay directory")
+    parser.add_argument("--capture", metavar="PATH", default=None,
+                        help="record the screen to a video through ffmpeg, or raw frames if PATH ends in .raw")
+    parser.add_argument("--storm", action="store_true", help="stress mode: thousands of objects on a rising spawn curve")
+    parser.add_argument("--storm-objects", type=int, default=None, help="cap on simultaneous objects in storm mode")
+    parser.add_argument("--storm-curve", default=None, metavar="TICK:RATE,...",
+                        help="storm spawn curve as tick:objects-per-tick points, e.g. 0:1,600:20")
+    parser.add_argument("--profile", action="store_true", help="time each frame phase and show p50/p99 on screen (F3 toggles)")
+    parser.add_argument("--profile-trace", metavar="PATH", default=None,
+                        help="profile and write a Chrome trace / Perfetto JSON on exit")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    use_trained_ai = "--use-trained-ai" in sys.argv
-    trained_model = None
+    args = parse_args()
+    model_loader = None
+
+    # Start loading before pygame opens the window so the menu appears immediately
+    if args.inference_server:
+        args.use_trained_ai = True
+    if args.use_trained_ai:
+        model_loader = ModelLoader(started_at=STARTED_AT, server=args.inference_server)
 
-    if use_trained_ai:
-        from trained_ai_player import load_trained_model
-        trained_model = load_trained_model()
+    from config import STORM_MAX_OBJECTS, STORM_SPAWN_CURVE
+    from game import Game
+    from storm import parse_spawn_curve
 
-        if trained_model is None:
-            print("\nFalling back to heuristic AI...")
-            use_trained_ai = False
+    storm_curve = parse_spawn_curve(args.storm_curve) if args.storm_curve else STORM_SPAWN_CURVE
 
-    game = Game(use_trained_ai=use_trained_ai, trained_model=trained_model)
+    game = Game(use_trained_ai=args.use_trained_ai, model_loader=model_loader, started_at=STARTED_AT,
+                speed=args.speed, turbo=args.turbo, headless=args.headless,
+                ai_vs_ai=args.ai_vs_ai, max_matches=args.matches, seed=args.seed,
+                record_path=args.record, profile=args.profile, profile_trace=args.profile_trace,
+                use_planner_ai=args.planner_ai, storm=args.storm,
+                storm_objects=args.storm_objects or STORM_MAX_OBJECTS, storm_curve=storm_curve,
+                capture_path=args.capture)
     game.run()
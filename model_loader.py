@@ -0,0 +1,32 @@
+import threading
+import time
+
+class ModelLoader:
+    def __init__(self, started_at=None, server=None):
+        self.server = server
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.model = None
+        self.ready_at = None
+        self.done = False
+        self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        try:
+            from trained_ai_player import load_trained_model
+            self.model = load_trained_model(self.server)
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            self.model = None
+        self.ready_at = time.perf_counter()
+        self.done = True
+
+    @property
+    def failed(self):
+        return self.done and self.model is None
+
+    @property
+    def load_time(self):
+        if self.ready_at is None:
+            return None
+        return self.ready_at - self.started_at
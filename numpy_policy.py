@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+DEFAULT_MODEL_PATH = "models/dodge_game_ppo"
+
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0, out=x),
+}
+
+
+class NumpyPolicy:
+    def __init__(self, weights, biases, activation="Tanh", action_repeat=1):
+        self.action_repeat = action_repeat
+        self.weights = [np.ascontiguousarray(w.T, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activation = activation
+        self.activation_fn = ACTIVATIONS[activation]
+        self.observation_size = self.weights[0].shape[0]
+        self.rng = np.random.default_rng()
+
+    def logits(self, observations):
+        x = np.asarray(observations, dtype=np.float32).reshape(-1, self.observation_size)
+        last = len(self.weights) - 1
+        for index, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if index < last:
+                x = self.activation_fn(x)
+        return x
+
+    # Same call shape as stable_baselines3's BaseAlgorithm.predict
+    def predict(self, observation, state=None, episode_start=None, deterministic=True):
+        logits = self.logits(observation)
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else:
+            logits -= logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            draws = self.rng.random((len(logits), 1))
+            actions = (probabilities.cumsum(axis=1) < draws).sum(axis=1)
+
+        if np.ndim(observation) == 1:
+            return actions[0], state
+        return actions, state
+
+
+def policy_arrays(model_path=DEFAULT_MODEL_PATH):
+    from stable_baselines3 import PPO
+    return model_policy_arrays(PPO.load(model_path, device="cpu"))
+
+
+def model_policy_arrays(model):
+    import torch
+
+    policy_layers = [layer for layer in model.policy.mlp_extractor.policy_net if isinstance(layer, torch.nn.Linear)]
+    layers = policy_layers + [model.policy.action_net]
+
+    arrays = {}
+    for index, layer in enumerate(layers):
+        arrays[f"weight_{index}"] = layer.weight.detach().cpu().numpy().astype(np.float32)
+        arrays[f"bias_{index}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+    arrays["activation"] = np.array(model.policy.activation_fn.__name__)
+    return arrays
+
+
+def export_policy(model_path=DEFAULT_MODEL_PATH, output_path=None, action_repeat=1):
+    # action_repeat is stored with the weights so players decide as often as in training
+    if output_path is None:
+        output_path = f"{model_path}.npz"
+    np.savez(output_path, action_repeat=np.array(action_repeat), **policy_arrays(model_path))
+    return output_path
+
+
+def policy_from_arrays(arrays):
+    layer_count = sum(1 for key in arrays if key.startswith("weight_"))
+    weights = [arrays[f"weight_{index}"] for index in range(layer_count)]
+    biases = [arrays[f"bias_{index}"] for index in range(layer_count)]
+    action_repeat = int(arrays["action_repeat"]) if "action_repeat" in arrays else 1
+    return NumpyPolicy(weights, biases, str(arrays["activation"]), action_repeat)
+
+
+def load_numpy_policy(path):
+    with np.load(path) as data:
+        return policy_from_arrays({key: data[key] for key in data.files})
+
+
+def load_policy(path, action_repeat=1):
+    # Accepts an exported .npz or a stable_baselines3 .zip checkpoint;
+    # .zip files carry no action_repeat, so it has to be passed in
+    if path.endswith(".npz"):
+        return load_numpy_policy(path)
+    arrays = policy_arrays(path)
+    arrays["action_repeat"] = action_repeat
+    return policy_from_arrays(arrays)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export PPO policy weights for NumPy inference")
+    parser.add_argument("model_path", nargs="?", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--action-repeat", type=int, default=1, help="ticks per decision the model was trained with")
+    args = parser.parse_args()
+    if not os.path.exists(f"{args.model_path}.zip"):
+        print(f"Error: Trained model not found at {args.model_path}.zip")
+        sys.exit(1)
+    print(f"Policy weights exported to {export_policy(args.model_path, action_repeat=args.action_repeat)}")
@@ -0,0 +1,166 @@
+import numpy as np
+from config import *
+from spatial_index import nearest_threats
+
+OBSERVATION_SIZE = 12
+THREAT_COUNT = 3
+THREAT_HORIZON = SCREEN_HEIGHT * 0.6
+EMPTY_THREAT = (0.0, 1.0, 0.0)
+_RANKS = np.arange(THREAT_COUNT)
+
+# Layout: ai center, distance to the right edge, distance to the left edge, then
+# (horizontal offset, vertical distance, speed) for the 3 nearest objects above
+# THREAT_HORIZON, nearest first, padded with EMPTY_THREAT.
+
+
+class ObservationEncoder:
+    # Batched encoder for a fixed number of games and object slots. Object
+    # arrays hold one row per game, with `valid` marking live slots. Scratch
+    # buffers are allocated once and reused every step.
+    def __init__(self, n_games, max_objects):
+        shape = (n_games, max(max_objects, THREAT_COUNT))
+        threats = (n_games, THREAT_COUNT)
+        self.max_objects = max_objects
+        self.rows = np.arange(n_games)
+        self.row_starts = (self.rows * shape[1])[:, None]
+        self.vertical = np.empty(shape)
+        self.key = np.empty(shape)
+        self.candidates = np.empty(shape, dtype=bool)
+        self.order = np.empty(threats, dtype=np.intp)
+        self.flat_order = np.empty(threats, dtype=np.intp)
+        self.found = np.empty(threats, dtype=bool)
+        self.missing = np.empty(threats, dtype=bool)
+        self.centers = np.empty(threats)
+        self.half_sizes = np.empty(threats)
+        self.threat_vertical = np.empty(threats)
+        self.threat_speed = np.empty(threats)
+        self.horizontal = np.empty(threats)
+        # Float, so fractional player positions aren't truncated
+        self.ai_center = np.empty(n_games)
+        self.ai_right = np.empty(n_games)
+        self.staging = {}
+
+    def nearest(self):
+        # k argmin passes instead of a sort. argmin returns the first of equal
+        # keys, so ties come out in slot order exactly as a stable sort would give.
+        key, rows, order = self.key, self.rows, self.order
+        for rank in range(THREAT_COUNT):
+            column = key.argmin(axis=1)
+            order[:, rank] = column
+            key[rows, column] = np.inf
+        np.add(self.row_starts, order, out=self.flat_order)
+        np.less(_RANKS, self.candidates.sum(axis=1)[:, None], out=self.found)
+        np.logical_not(self.found, out=self.missing)
+
+    def gather(self, values, out):
+        # The chosen slots of each row; clip mode lets take write straight into
+        # out. take won't cast, so e.g. integer columns go through a staging buffer.
+        if values.dtype == out.dtype:
+            return np.take(values.reshape(-1), self.flat_order, out=out, mode="clip")
+        staging = self.staging.get(values.dtype)
+        if staging is None:
+            staging = self.staging[values.dtype] = np.empty(out.shape, dtype=values.dtype)
+        np.copyto(out, np.take(values.reshape(-1), self.flat_order, out=staging, mode="clip"))
+        return out
+
+    def encode(self, ai_x, obj_x, obj_y, obj_size, obj_speed, valid, out):
+        return self.encode_players((ai_x,), obj_x, obj_y, obj_size, obj_speed, valid, (out,))[0]
+
+    def encode_players(self, players_x, obj_x, obj_y, obj_size, obj_speed, valid, outs):
+        # Several players in the same games. The nearest threats depend only on
+        # the objects, so they are found once and only the player features differ.
+        if self.max_objects < THREAT_COUNT:
+            padding = ((0, 0), (0, THREAT_COUNT - self.max_objects))
+            obj_x, obj_y, obj_size, obj_speed, valid = (np.pad(array, padding)
+                                                        for array in (obj_x, obj_y, obj_size, obj_speed, valid))
+
+        np.less(obj_y, THREAT_HORIZON, out=self.candidates)
+        self.candidates &= valid
+        np.subtract(SCREEN_HEIGHT, obj_y, out=self.vertical)
+        self.vertical /= SCREEN_HEIGHT
+        self.key.fill(np.inf)
+        np.copyto(self.key, self.vertical, where=self.candidates)
+        self.nearest()
+        missing = self.missing
+
+        centers = self.gather(obj_x, self.centers)
+        half_sizes = self.gather(obj_size, self.half_sizes)
+        np.floor_divide(half_sizes, 2, out=half_sizes)
+        centers += half_sizes
+        vertical = self.gather(self.vertical, self.threat_vertical)
+        np.copyto(vertical, EMPTY_THREAT[1], where=missing)
+        speed = self.gather(obj_speed, self.threat_speed)
+        speed /= OBJECT_MAX_SPEED
+        np.copyto(speed, EMPTY_THREAT[2], where=missing)
+        for ai_x, out in zip(players_x, outs):
+            ai_center = np.add(ai_x, PLAYER_WIDTH // 2, out=self.ai_center)
+            np.divide(ai_center, SCREEN_WIDTH, out=out[:, 0])
+            np.divide(np.subtract(SCREEN_WIDTH, ai_x, out=self.ai_right), SCREEN_WIDTH, out=out[:, 1])
+            np.divide(ai_x, SCREEN_WIDTH, out=out[:, 2])
+            horizontal = np.subtract(centers, ai_center[:, None], out=self.horizontal)
+            horizontal /= SCREEN_WIDTH
+            np.copyto(horizontal, EMPTY_THREAT[0], where=missing)
+            out[:, 3::3] = horizontal
+            out[:, 4::3] = vertical
+            out[:, 5::3] = speed
+        return outs
+
+
+class GameEncoder:
+    # Observation of one live game, kept by a player or env. Array-backed
+    # objects (storm.StormWorld) are copied into an ObservationEncoder whose
+    # slots are sized to the collection's capacity on first use. Other
+    # collections hand over their nearest threats (simulation.World from its
+    # index), and those few are encoded in plain Python with the same
+    # arithmetic as ObservationEncoder: a dozen NumPy calls on three threats
+    # cost more than the rest of a DodgeGameEnv step.
+    def __init__(self, max_objects=THREAT_COUNT):
+        self.ai_x = np.zeros(1)
+        self.observation = np.empty((1, OBSERVATION_SIZE), dtype=np.float32)
+        self.allocate(max_objects)
+
+    def allocate(self, max_objects):
+        shape = (1, max(max_objects, THREAT_COUNT))
+        self.encoder = ObservationEncoder(*shape)
+        self.obj_x = np.zeros(shape)
+        self.obj_y = np.zeros(shape)
+        self.obj_size = np.zeros(shape)
+        self.obj_speed = np.zeros(shape)
+        self.valid = np.zeros(shape, dtype=bool)
+
+    def load_arrays(self, falling_objects):
+        columns = falling_objects.arrays()
+        count = len(columns[0])
+        if count > self.encoder.max_objects:
+            self.allocate(max(count, getattr(falling_objects, "max_objects", count)))
+        for buffer, column in zip((self.obj_x, self.obj_y, self.obj_size, self.obj_speed), columns):
+            buffer[0, :count] = column
+        self.valid[0, :count] = True
+        self.valid[0, count:] = False
+
+    def encode(self, ai_x, falling_objects, out=None):
+        if out is None:
+            out = np.empty(OBSERVATION_SIZE, dtype=np.float32)
+        if hasattr(falling_objects, "arrays"):
+            self.load_arrays(falling_objects)
+            self.ai_x[0] = ai_x
+            self.encoder.encode(self.ai_x, self.obj_x, self.obj_y, self.obj_size, self.obj_speed,
+                                self.valid, self.observation)
+            out[:] = self.observation[0]
+            return out
+
+        ai_center = ai_x + PLAYER_WIDTH // 2
+        features = [ai_center / SCREEN_WIDTH, (SCREEN_WIDTH - ai_x) / SCREEN_WIDTH, ai_x / SCREEN_WIDTH]
+        threats = nearest_threats(falling_objects, THREAT_HORIZON, THREAT_COUNT)
+        for obj in threats:
+            features += ((obj.x + obj.size // 2 - ai_center) / SCREEN_WIDTH,
+                         (SCREEN_HEIGHT - obj.y) / SCREEN_HEIGHT,
+                         obj.speed / OBJECT_MAX_SPEED)
+        features += EMPTY_THREAT * (THREAT_COUNT - len(threats))
+        out[:] = features
+        return out
+
+
+def encode_observations(ai_x, obj_x, obj_y, obj_size, obj_speed, valid, out):
+    # One-off batched encoding; hot loops should keep an ObservationEncoder
+    return ObservationEncoder(*obj_y.shape).encode(ai_x, obj_x, obj_y, obj_size, obj_speed, valid, out)
@@ -0,0 +1,123 @@
+import math
+import time
+from player import Player
+from config import *
+
+PLANNER_HORIZON = 240
+PLANNER_TIME_BUDGET = 0.002
+PLANNER_REPLAN_MARGIN = 30
+IMPACT_MARGIN = 1
+
+
+class PlannerAIPlayer(Player):
+    # Objects fall straight down at a constant speed, so the ticks during which
+    # an object overlaps the player's row, and the positions it blocks, are known
+    # as soon as it spawns. Positions live on the PLAYER_SPEED lattice, one bit
+    # per position, and predicted impacts go into a calendar of one blocked-positions
+    # row per future tick. Each object is added once when it spawns and each row is
+    # dropped once its tick has passed, so the search only reads rows and each of
+    # its ticks is a few bitwise operations on whole rows.
+    def __init__(self, x, y, time_budget=PLANNER_TIME_BUDGET, horizon=PLANNER_HORIZON):
+        super().__init__(x, y, PLAYER2_COLOR, "Planner AI Player")
+        self.time_budget = time_budget
+        self.horizon = horizon
+        self.position_count = (SCREEN_WIDTH - self.width) // self.speed + 1
+        self.all_positions = (1 << self.position_count) - 1
+        self.center_index = (SCREEN_WIDTH // 2 - self.width // 2) // self.speed
+        self.blocked = {}
+        self.last_serial = -1
+        self.tick = 0
+        self.plan = []
+        self.plan_start = 0
+        self.doomed = False
+        self.replans = 0
+
+    def impact(self, obj):
+        # (first tick, last tick, blocked positions) for the collision checks that
+        # follow updates self.tick + k - 1, when the object is at obj.y + speed * k
+        low = self.y - obj.size - IMPACT_MARGIN
+        high = self.y + self.height + IMPACT_MARGIN
+        first = max(math.floor((low - obj.y) / obj.speed) + 1, 1)
+        last = math.ceil((high - obj.y) / obj.speed) - 1
+        if last < first:
+            return None
+
+        left = max(math.floor((obj.x - self.width - IMPACT_MARGIN) / self.speed) + 1, 0)
+        right = min(math.ceil((obj.x + obj.size + IMPACT_MARGIN) / self.speed) - 1, self.position_count - 1)
+        mask = ((1 << (right - left + 1)) - 1) << left
+        return self.tick + first - 1, self.tick + last - 1, mask
+
+    def observe(self, falling_objects):
+        # Objects are kept in spawn order, so new ones are at the end of the list.
+        # Returns whether any new impact crosses the current plan.
+        crosses_plan = False
+        newest = self.last_serial
+        for obj in reversed(falling_objects):
+            if obj.serial <= self.last_serial:
+                break
+            newest = max(newest, obj.serial)
+            impact = self.impact(obj)
+            if impact is None:
+                continue
+            first, last, mask = impact
+            plan_end = self.plan_start + len(self.plan)
+            for tick in range(first, last + 1):
+                self.blocked[tick] = self.blocked.get(tick, 0) | mask
+                if self.plan_start <= tick < plan_end and mask >> self.plan[tick - self.plan_start] & 1:
+                    crosses_plan = True
+        self.last_serial = newest
+
+        self.blocked.pop(self.tick - 1, None)
+        return crosses_plan
+
+    def replan(self):
+        deadline = time.perf_counter() + self.time_budget
+        self.replans += 1
+        start = min(max(round(self.x / self.speed), 0), self.position_count - 1)
+        blocked = self.blocked
+
+        # Forward sweep: reach[t] holds every position alive after t ticks
+        reach = [1 << start]
+        out_of_time = False
+        for step in range(1, self.horizon + 1):
+            current = reach[-1]
+            current = (current | current << 1 | current >> 1) & self.all_positions & ~blocked.get(self.tick + step - 1, 0)
+            if not current:
+                break
+            reach.append(current)
+            if step % 16 == 0 and time.perf_counter() > deadline:
+                out_of_time = True
+                break
+        self.doomed = len(reach) <= self.horizon and not out_of_time
+
+        # Walk back from the reachable end position closest to the center, staying put when possible
+        index = self.nearest(reach[-1], self.center_index)
+        path = [index]
+        for step in range(len(reach) - 2, 0, -1):
+            index = self.nearest(reach[step], index)
+            path.append(index)
+        path.reverse()
+        self.plan = path if len(reach) > 1 else []
+        self.plan_start = self.tick
+
+    def nearest(self, positions, index):
+        for distance in range(self.position_count):
+            for candidate in (index - distance, index + distance):
+                if 0 <= candidate < self.position_count and positions >> candidate & 1:
+                    return candidate
+        return index
+
+    def update(self, falling_objects):
+        crosses_plan = self.observe(falling_objects)
+        step = self.tick - self.plan_start
+        if crosses_plan or self.doomed or step >= len(self.plan) - PLANNER_REPLAN_MARGIN:
+            self.replan()
+            step = 0
+
+        if step < len(self.plan):
+            target_x = self.plan[step] * self.speed
+            if target_x < self.x:
+                self.move(-1)
+            elif target_x > self.x:
+                self.move(1)
+        self.tick += 1
@@ -1,5 +1,6 @@
 import pygame
 from config import *
+from renderer import player_sprite
 
 class Player:
     def __init__(self, x, y, color, name):
@@ -11,6 +12,7 @@ class Player:
         self.height = PLAYER_HEIGHT
         self.speed = PLAYER_SPEED
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
+        self.previous_x = self.x
         self.alive = True
 
     def move(self, dx):
@@ -18,27 +20,11 @@ class Player:
         self.x = max(0, min(self.x, SCREEN_WIDTH - self.width))
         self.rect.x = self.x
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect, border_radius=10)
-
-        eye_y = self.rect.y + self.height // 3
-        left_eye = pygame.Rect(
-            self.rect.x + self.width // 4 - 5,
-            eye_y,
-            10, 10
-        )
-        right_eye = pygame.Rect(
-            self.rect.x + 3 * self.width // 4 - 5,
-            eye_y,
-            10, 10
-        )
-        pygame.draw.rect(surface, (255, 255, 255), left_eye, border_radius=5)
-        pygame.draw.rect(surface, (255, 255, 255), right_eye, border_radius=5)
-
-        pygame.draw.circle(surface, (0, 0, 0),
-                         (left_eye.centerx, left_eye.centery), 3)
-        pygame.draw.circle(surface, (0, 0, 0),
-                         (right_eye.centerx, right_eye.centery), 3)
+    def draw(self, surface, alpha=1.0):
+        x = self.previous_x + (self.x - self.previous_x) * alpha
+        position = self.rect.copy()
+        position.x = x
+        return surface.blit(player_sprite(self.color, self.width, self.height), position)
 
 class ManualPlayer(Player):
     def __init__(self, x, y):
@@ -0,0 +1,127 @@
+import json
+import os
+import time
+import numpy as np
+
+PROFILER_CAPACITY = 65536
+PROFILER_WINDOW = 240
+PROFILER_REFRESH = 0.5
+
+
+class FrameProfiler:
+    # Lap timer over a fixed-size ring buffer of (phase, frame, start, duration).
+    # next_frame() starts a frame and mark(name) closes the phase that ran since
+    # the previous mark, so a disabled profiler costs one attribute check per call.
+    def __init__(self, enabled=True, capacity=PROFILER_CAPACITY):
+        self.capacity = capacity
+        self.phases = ["frame"]
+        self.phase_lookup = {"frame": 0}
+        self.frame = 0
+        self.frame_started = 0
+        self.last_mark = 0
+        self.count = 0
+        self.phase_ids = None
+        self.frames = None
+        self.starts = None
+        self.durations = None
+        self.stats_cache = {}
+        self.stats_time = 0.0
+        self.enabled = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if self.phase_ids is None:
+            self.phase_ids = np.zeros(self.capacity, dtype=np.int16)
+            self.frames = np.zeros(self.capacity, dtype=np.int64)
+            self.starts = np.zeros(self.capacity, dtype=np.int64)
+            self.durations = np.zeros(self.capacity, dtype=np.int64)
+        self.frame_started = 0
+        self.last_mark = time.perf_counter_ns()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def next_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self.frame_started:
+            self.record(0, self.frame_started, now)
+        self.frame += 1
+        self.frame_started = self.last_mark = now
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        phase_id = self.phase_lookup.get(name)
+        if phase_id is None:
+            phase_id = self.phase_lookup[name] = len(self.phases)
+            self.phases.append(name)
+        self.record(phase_id, self.last_mark, now)
+        self.last_mark = now
+
+    def record(self, phase_id, started, ended):
+        slot = self.count % self.capacity
+        self.phase_ids[slot] = phase_id
+        self.frames[slot] = self.frame
+        self.starts[slot] = started
+        self.durations[slot] = ended - started
+        self.count += 1
+
+    def _ordered(self):
+        # Buffer contents oldest first
+        if self.count <= self.capacity:
+            order = slice(0, self.count)
+            return self.phase_ids[order], self.frames[order], self.starts[order], self.durations[order]
+        split = self.count % self.capacity
+        return tuple(np.concatenate((array[split:], array[:split]))
+                     for array in (self.phase_ids, self.frames, self.starts, self.durations))
+
+    def stats(self, window=PROFILER_WINDOW):
+        # Rolling p50/p99 in milliseconds over the last `window` samples of each phase
+        if self.count == 0:
+            return {}
+        phase_ids, _, _, durations = self._ordered()
+        stats = {}
+        for phase_id, name in enumerate(self.phases):
+            samples = durations[phase_ids == phase_id][-window:]
+            if len(samples):
+                p50, p99 = np.percentile(samples, (50, 99)) / 1e6
+                stats[name] = (float(p50), float(p99))
+        return stats
+
+    def cached_stats(self, refresh=PROFILER_REFRESH):
+        now = time.perf_counter()
+        if now - self.stats_time >= refresh:
+            self.stats_cache = self.stats()
+            self.stats_time = now
+        return self.stats_cache
+
+    def summary(self):
+        stats = self.stats(window=self.capacity)
+        print(f"{'phase':16s} {'p50 ms':>8s} {'p99 ms':>8s}")
+        for name, (p50, p99) in stats.items():
+            print(f"{name:16s} {p50:8.3f} {p99:8.3f}")
+
+    def export_chrome_trace(self, path):
+        # Complete ("X") events in microseconds, readable by chrome://tracing and Perfetto.
+        # Each "frame" event encloses the phases recorded during that frame.
+        phase_ids, frames, starts, durations = self._ordered()
+        origin = int(starts.min()) if len(starts) else 0
+        pid = os.getpid()
+        events = [{
+            "name": self.phases[phase_id],
+            "ph": "X",
+            "ts": (start - origin) / 1000,
+            "dur": duration / 1000,
+            "pid": pid,
+            "tid": 0,
+            "args": {"frame": frame},
+        } for phase_id, frame, start, duration in zip(phase_ids.tolist(), frames.tolist(),
+                                                      starts.tolist(), durations.tolist())]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
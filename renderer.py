@@ -0,0 +1,133 @@
+import numpy as np
+import pygame
+from config import *
+from simulation import pixel_positions
+
+_object_sprites = {}
+_player_sprites = {}
+_object_atlas = []
+ATLAS_COLORKEY = (255, 0, 255)
+
+
+def object_sprite(size):
+    sprite = _object_sprites.get(size)
+    if sprite is None:
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.rect(sprite, OBJECT_COLOR, sprite.get_rect(), border_radius=8)
+        highlight = pygame.Rect(size // 4, size // 4, size // 3, size // 3)
+        pygame.draw.rect(sprite, (255, 100, 100), highlight, border_radius=4)
+        _object_sprites[size] = sprite
+    return sprite
+
+
+def object_atlas():
+    # Object sprites for every size, indexed by size. The sprites' alpha is only
+    # ever 0 or 255, so they become display-format colorkey surfaces with RLE,
+    # which SDL blits several times faster than per-pixel alpha.
+    if not _object_atlas and pygame.display.get_surface() is not None:
+        for size in range(OBJECT_MAX_SIZE + 1):
+            sprite = pygame.Surface((max(size, 1), max(size, 1)))
+            sprite.fill(ATLAS_COLORKEY)
+            if size >= OBJECT_MIN_SIZE:
+                sprite.blit(object_sprite(size), (0, 0))
+            sprite = sprite.convert()
+            sprite.set_colorkey(ATLAS_COLORKEY, pygame.RLEACCEL)
+            _object_atlas.append(sprite)
+    return _object_atlas
+
+
+def draw_objects(surface, obj_x, obj_y, obj_size, doreturn=True):
+    # All objects in one blit call. Returns their rects, or None with doreturn=False.
+    atlas = object_atlas()
+    lookup = atlas.__getitem__ if atlas else object_sprite
+    sprites = map(lookup, obj_size.astype(np.int64).tolist())
+    positions = zip(pixel_positions(obj_x).tolist(), pixel_positions(obj_y).tolist())
+    fblits = getattr(surface, "fblits", None)
+    if not doreturn and fblits is not None:
+        fblits(zip(sprites, positions))
+        return None
+    return surface.blits(zip(sprites, positions), doreturn=doreturn)
+
+
+def player_sprite(color, width=PLAYER_WIDTH, height=PLAYER_HEIGHT):
+    key = (color, width, height)
+    sprite = _player_sprites.get(key)
+    if sprite is None:
+        sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+        pygame.draw.rect(sprite, color, sprite.get_rect(), border_radius=10)
+
+        eye_y = height // 3
+        left_eye = pygame.Rect(width // 4 - 5, eye_y, 10, 10)
+        right_eye = pygame.Rect(3 * width // 4 - 5, eye_y, 10, 10)
+        pygame.draw.rect(sprite, (255, 255, 255), left_eye, border_radius=5)
+        pygame.draw.rect(sprite, (255, 255, 255), right_eye, border_radius=5)
+
+        pygame.draw.circle(sprite, (0, 0, 0), left_eye.center, 3)
+        pygame.draw.circle(sprite, (0, 0, 0), right_eye.center, 3)
+        _player_sprites[key] = sprite
+    return sprite
+
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = {}
+
+    def render(self, font, text, color):
+        key = (id(font), text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.max_entries:
+                self.surfaces.clear()
+            surface = font.render(text, True, color)
+            self.surfaces[key] = surface
+        return surface
+
+
+class DirtyRects:
+    # Erases last frame's rects, collects this frame's, and pushes both regions
+    def __init__(self, background=BACKGROUND_COLOR, full_update_threshold=200):
+        self.background = background
+        self.full_update_threshold = full_update_threshold
+        self.previous = []
+        self.current = []
+        self.previous_full = False
+        self.current_full = False
+
+    def reset(self):
+        self.previous = []
+        self.current = []
+        self.previous_full = False
+        self.current_full = False
+
+    def erase(self, surface):
+        if self.previous_full:
+            surface.fill(self.background)
+            return
+        for rect in self.previous:
+            surface.fill(self.background, rect)
+
+    def add(self, rect):
+        self.current.append(rect)
+
+    def extend(self, rects):
+        self.current.extend(rects)
+
+    def cover_screen(self):
+        # Too much drew this frame to track rects: erase and present the whole screen
+        self.current_full = True
+
+    def wants_rects(self, count):
+        return not self.current_full and len(self.current) + count <= self.full_update_threshold
+
+    def present(self, full=False):
+        changed = self.previous + self.current
+        full = full or self.current_full or self.previous_full
+        self.previous = self.current
+        self.previous_full = self.current_full
+        self.current = []
+        self.current_full = False
+        if full or len(changed) > self.full_update_threshold:
+            pygame.display.flip()
+        else:
+            pygame.display.update(changed)
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import numpy as np
+from config import *
+
+REPLAY_VERSION = 1
+
+TICK_DTYPE = np.dtype([
+    ("match", np.uint32),
+    ("tick", np.uint32),
+    ("p1_x", np.float32),
+    ("p2_x", np.float32),
+    ("p1_action", np.int8),
+    ("p2_action", np.int8),
+    ("p1_alive", np.bool_),
+    ("p2_alive", np.bool_),
+    ("object_start", np.uint64),
+    ("object_count", np.uint16),
+])
+
+OBJECT_DTYPE = np.dtype([
+    ("x", np.int16),
+    ("y", np.float32),
+    ("size", np.uint8),
+    ("speed", np.float32),
+])
+
+
+class MappedArray:
+    # A growable structured array backed by a memory-mapped file
+    def __init__(self, path, dtype, capacity=65536):
+        self.dtype = np.dtype(dtype)
+        self.file = open(path, "w+b")
+        self.array = None
+        self.length = 0
+        self.capacity = 0
+        self._resize(capacity)
+
+    def _resize(self, capacity):
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+        self.file.truncate(capacity * self.dtype.itemsize)
+        self.array = np.memmap(self.file, dtype=self.dtype, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def extend(self, count):
+        if self.length + count > self.capacity:
+            self._resize(max(self.capacity * 2, self.length + count))
+        view = self.array[self.length:self.length + count]
+        self.length += count
+        return view
+
+    def append(self, record):
+        if self.length == self.capacity:
+            self._resize(self.capacity * 2)
+        self.array[self.length] = record
+        self.length += 1
+
+    def close(self):
+        self.array.flush()
+        self.array = None
+        self.file.truncate(self.length * self.dtype.itemsize)
+        self.file.close()
+
+
+def _action(previous_x, x):
+    if x < previous_x:
+        return 1
+    if x > previous_x:
+        return 2
+    return 0
+
+
+class ReplayRecorder:
+    def __init__(self, path, players=("Manual Player", "AI Player"), player_y=SCREEN_HEIGHT - 100):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.ticks = MappedArray(os.path.join(path, "ticks.bin"), TICK_DTYPE)
+        self.objects = MappedArray(os.path.join(path, "objects.bin"), OBJECT_DTYPE, capacity=1 << 20)
+        self.match = -1
+        self.write_meta(players, player_y)
+
+    def write_meta(self, players, player_y):
+        meta = {
+            "version": REPLAY_VERSION,
+            "screen": [SCREEN_WIDTH, SCREEN_HEIGHT],
+            "player_size": [PLAYER_WIDTH, PLAYER_HEIGHT],
+            "player_y": player_y,
+            "tick_rate": SIMULATION_TICK_RATE,
+            "players": list(players),
+            "tick_dtype": TICK_DTYPE.descr,
+            "object_dtype": OBJECT_DTYPE.descr,
+        }
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def start_match(self):
+        self.match += 1
+
+    def record(self, tick, player1, player2, falling_objects):
+        self.ticks.append((
+            self.match, tick,
+            player1.x, player2.x,
+            _action(player1.previous_x, player1.x), _action(player2.previous_x, player2.x),
+            player1.alive, player2.alive,
+            self.objects.length, len(falling_objects),
+        ))
+
+        if falling_objects:
+            rows = self.objects.extend(len(falling_objects))
+            rows[:] = [(obj.x, obj.y, obj.size, obj.speed) for obj in falling_objects]
+
+    def close(self):
+        self.ticks.close()
+        self.objects.close()
+
+
+class Replay:
+    # Read-only, zero-copy view over a recorded replay
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.ticks = self._load("ticks.bin", TICK_DTYPE)
+        self.objects = self._load("objects.bin", OBJECT_DTYPE)
+
+    def _load(self, name, dtype):
+        file_path = os.path.join(self.path, name)
+        if os.path.getsize(file_path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r")
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def frame(self, index):
+        record = self.ticks[index]
+        start = int(record["object_start"])
+        return record, self.objects[start:start + int(record["object_count"])]
+
+    def match_starts(self):
+        if len(self.ticks) == 0:
+            return np.zeros(0, dtype=np.int64)
+        matches = self.ticks["match"]
+        return np.flatnonzero(np.r_[True, matches[1:] != matches[:-1]])
+
+
+def load_replay(path):
+    return Replay(path)
+
+
+def view(path):
+    import pygame
+    from renderer import object_sprite, player_sprite, TextCache
+
+    replay = load_replay(path)
+    if len(replay) == 0:
+        print("Replay is empty")
+        return
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption(f"Replay - {path}")
+    clock = pygame.time.Clock()
+    font = pygame.font.Font(None, 32)
+    text_cache = TextCache()
+    match_starts = replay.match_starts()
+
+    position = 0.0
+    speed = 1.0
+    paused = False
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                step = 60 if event.mod & pygame.KMOD_SHIFT else 1
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    position += step
+                elif event.key == pygame.K_LEFT:
+                    position -= step
+                elif event.key == pygame.K_UP:
+                    speed = min(speed * 2, 64)
+                elif event.key == pygame.K_DOWN:
+                    speed = max(speed / 2, 0.125)
+                elif event.key == pygame.K_PAGEDOWN:
+                    later = match_starts[match_starts > int(position)]
+                    position = later[0] if len(later) else position
+                elif event.key == pygame.K_PAGEUP:
+                    earlier = match_starts[match_starts < int(position)]
+                    position = earlier[-1] if len(earlier) else 0
+                elif event.key == pygame.K_HOME:
+                    position = 0
+                elif event.key == pygame.K_END:
+                    position = len(replay) - 1
+
+        if not paused:
+            position += speed
+        position = min(max(position, 0), len(replay) - 1)
+
+        record, objects = replay.frame(int(position))
+        screen.fill(BACKGROUND_COLOR)
+        for obj in objects:
+            screen.blit(object_sprite(int(obj["size"])), (int(obj["x"]), round(float(obj["y"]))))
+        player_y = replay.meta["player_y"]
+        screen.blit(player_sprite(PLAYER1_COLOR), (int(record["p1_x"]), player_y))
+        screen.blit(player_sprite(PLAYER2_COLOR), (int(record["p2_x"]), player_y))
+
+        status = (f"Match {record['match']}  Tick {record['tick']}  "
+                  f"Frame {int(position) + 1}/{len(replay)}  Speed {speed:g}x{'  PAUSED' if paused else ''}")
+        screen.blit(font.render(status, True, TEXT_COLOR), (10, 10))
+        help_text = text_cache.render(font, "SPACE pause  LEFT/RIGHT scrub  UP/DOWN speed  PGUP/PGDN match", (150, 150, 150))
+        screen.blit(help_text, (10, SCREEN_HEIGHT - 30))
+
+        progress = int(position) / max(len(replay) - 1, 1)
+        pygame.draw.rect(screen, (60, 70, 90), (10, 40, SCREEN_WIDTH - 20, 6))
+        pygame.draw.rect(screen, PLAYER1_COLOR, (10, 40, int((SCREEN_WIDTH - 20) * progress), 6))
+
+        pygame.display.flip()
+        clock.tick(SIMULATION_TICK_RATE)
+
+    pygame.quit()
+
+
+def info(path):
+    replay = load_replay(path)
+    print(f"{path}: {len(replay)} ticks, {len(replay.match_starts())} matches, {len(replay.objects)} object records")
+    size = os.path.getsize(os.path.join(path, "ticks.bin")) + os.path.getsize(os.path.join(path, "objects.bin"))
+    print(f"{size / 1e6:.1f} MB on disk ({size / max(len(replay), 1):.0f} bytes/tick)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or play back recorded matches")
+    parser.add_argument("command", choices=["view", "info"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+    if args.command == "view":
+        view(args.path)
+    else:
+        info(args.path)
@@ -0,0 +1,162 @@
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from config import *
+from observation import OBSERVATION_SIZE
+from vec_env import DodgeVecEnv
+
+SELF_PLAY_ENVS = 64
+SELF_PLAY_POOL_SIZE = 8
+SELF_PLAY_POOL_FREQ = 50000
+SELF_PLAY_OUTLAST_REWARD = 3.0
+# Starting x of the two players, as in Game; the learner's side is drawn per match
+START_POSITIONS = (100, SCREEN_WIDTH - 150)
+
+
+class OpponentPool:
+    # Frozen NumPy policies for the opponent side. Once full, each new one
+    # replaces the oldest; matches playing that slot switch to the newcomer.
+    def __init__(self, size=SELF_PLAY_POOL_SIZE):
+        self.size = size
+        self.policies = []
+        self.next_slot = 0
+        self.added = 0
+
+    def __len__(self):
+        return len(self.policies)
+
+    def add(self, policy):
+        if policy.observation_size != OBSERVATION_SIZE:
+            raise ValueError(f"opponents need {OBSERVATION_SIZE}-feature policies, got {policy.observation_size}")
+        if len(self.policies) < self.size:
+            self.policies.append(policy)
+        else:
+            self.policies[self.next_slot] = policy
+            self.next_slot = (self.next_slot + 1) % self.size
+        self.added += 1
+
+    def actions(self, observations, slots, out):
+        # One batched forward pass per pool member; slot -1 (empty pool) stands still
+        out.fill(0)
+        for slot, policy in enumerate(self.policies):
+            rows = np.flatnonzero(slots == slot)
+            if len(rows):
+                out[rows] = policy.logits(observations[rows]).argmax(axis=1)
+        return out
+
+
+class SelfPlayVecEnv(DodgeVecEnv):
+    # DodgeVecEnv with a second player in every match. The learner and an
+    # opponent drawn from the pool dodge the same objects, so the object
+    # simulation and threat search are shared; the extra cost is one more
+    # collision test, the player features and the opponent forward pass. A
+    # match ends when either player is hit. The learner earns
+    # SELF_PLAY_OUTLAST_REWARD for outlasting its opponent and loses it for being hit.
+    def __init__(self, n_envs=4, seed=None, max_steps=10000, action_repeat=1, pool_size=SELF_PLAY_POOL_SIZE):
+        super().__init__(n_envs, seed, max_steps, action_repeat)
+        self.opponents = OpponentPool(pool_size)
+        self.opponent_x = np.zeros(n_envs, dtype=np.int64)
+        self.opponent_slot = np.full(n_envs, -1, dtype=np.int64)
+        self.opponent_actions = np.zeros(n_envs, dtype=np.int64)
+        self.opponent_obs = np.zeros((n_envs, OBSERVATION_SIZE), dtype=np.float32)
+        self.outcome = np.zeros(n_envs, dtype=np.int64)
+
+    def add_opponent(self, policy):
+        self.opponents.add(policy)
+        # Matches that started against an empty pool pick up their opponent now
+        waiting = np.flatnonzero(self.opponent_slot < 0)
+        self.opponent_slot[waiting] = self.rng.integers(len(self.opponents), size=len(waiting))
+
+    def add_opponent_arrays(self, arrays):
+        from numpy_policy import policy_from_arrays
+        self.add_opponent(policy_from_arrays(arrays))
+
+    def _reset_envs(self, mask):
+        super()._reset_envs(mask)
+        rows = np.flatnonzero(mask)
+        learner_side = self.rng.integers(2, size=len(rows))
+        self.ai_x[rows] = np.take(START_POSITIONS, learner_side)
+        self.opponent_x[rows] = np.take(START_POSITIONS, 1 - learner_side)
+        if len(self.opponents):
+            self.opponent_slot[rows] = self.rng.integers(len(self.opponents), size=len(rows))
+
+    def _write_observations(self, out):
+        # Both players from one pass over the objects
+        self.encoder.encode_players((self.ai_x, self.opponent_x), self.obj_x, self.obj_y, self.obj_size,
+                                    self.obj_speed, self.alive, (out, self.opponent_obs))
+
+    def step_async(self, actions):
+        super().step_async(actions)
+        self.opponents.actions(self.opponent_obs, self.opponent_slot, self.opponent_actions)
+
+    def _hits(self):
+        # Whether each player touches an object this tick
+        band = self.alive & (SCREEN_HEIGHT - PLAYER_HEIGHT < self.obj_y + self.obj_size) & (SCREEN_HEIGHT > self.obj_y)
+        return [(band & (x < self.obj_x + self.obj_size) & (x + PLAYER_WIDTH > self.obj_x)).any(axis=1)
+                for x in (self.ai_x[:, None], self.opponent_x[:, None])]
+
+    def _tick(self, active):
+        self.steps += active
+        self.ai_x = self._move(self.ai_x, np.where(active, self.actions, 0))
+        self.opponent_x = self._move(self.opponent_x, np.where(active, self.opponent_actions, 0))
+        self._advance_objects(active)
+
+        learner_hit, opponent_hit = self._hits()
+        hit = active & learner_hit
+        finished = hit | (active & opponent_hit)
+        # Only a player left standing outlasts the other; both hit on the same
+        # tick is a draw, and the learner takes the usual penalty for its hit
+        won = finished & ~learner_hit
+        lost = hit & ~opponent_hit
+        self.collision_count += hit
+
+        rewards = self._shaping_rewards()
+        rewards += np.where(won, SELF_PLAY_OUTLAST_REWARD, 0.0)
+        rewards -= np.where(hit, SELF_PLAY_OUTLAST_REWARD, 0.0)
+        self.outcome[won] = 1
+        self.outcome[lost] = -1
+
+        truncated = active & ~finished & (self.steps >= self.max_steps)
+        rewards += np.where(truncated, 1.0, 0.0)
+        return np.where(active, rewards, 0.0), finished | truncated
+
+    def step_wait(self):
+        # outcome holds 1 (outlasted the opponent), -1 (was outlasted) or 0 (a draw or the time limit)
+        self.outcome[:] = 0
+        observations, rewards, dones, infos = super().step_wait()
+        for env_idx in np.flatnonzero(dones):
+            infos[env_idx]["outcome"] = int(self.outcome[env_idx])
+        return observations, rewards, dones, infos
+
+
+class SelfPlayCallback(BaseCallback):
+    # Adds a frozen copy of the learner to the opponent pool at the start and
+    # every pool_freq timesteps, and logs how often the learner outlasts the pool
+    def __init__(self, pool_freq=SELF_PLAY_POOL_FREQ, verbose=0):
+        super().__init__(verbose)
+        self.pool_freq = pool_freq
+        self.last_snapshot = 0
+        self.outcomes = []
+
+    def _on_training_start(self):
+        self.snapshot()
+
+    def snapshot(self):
+        from numpy_policy import model_policy_arrays
+        self.last_snapshot = self.num_timesteps
+        self.training_env.env_method("add_opponent_arrays", model_policy_arrays(self.model), indices=[0])
+
+    def _on_step(self):
+        for info in self.locals["infos"]:
+            if "outcome" in info:
+                self.outcomes.append(info["outcome"])
+        return True
+
+    def _on_rollout_end(self):
+        if self.outcomes:
+            outcomes = np.asarray(self.outcomes)
+            self.logger.record("self_play/win_rate", float(np.mean(outcomes == 1)))
+            self.logger.record("self_play/loss_rate", float(np.mean(outcomes == -1)))
+            self.outcomes = []
+        self.logger.record("self_play/pool_size", len(self.training_env.get_attr("opponents", indices=[0])[0]))
+        if self.num_timesteps - self.last_snapshot >= self.pool_freq:
+            self.snapshot()
@@ -0,0 +1,170 @@
+import multiprocessing as mp
+import time
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+from vec_env import DodgeVecEnv
+from observation import OBSERVATION_SIZE
+
+
+def _array_views(buffers, n_envs):
+    return {
+        "actions": np.frombuffer(buffers["actions"], dtype=np.int64),
+        "observations": np.frombuffer(buffers["observations"], dtype=np.float32).reshape(n_envs, OBSERVATION_SIZE),
+        "terminal_observations": np.frombuffer(buffers["terminal_observations"], dtype=np.float32).reshape(n_envs, OBSERVATION_SIZE),
+        "rewards": np.frombuffer(buffers["rewards"], dtype=np.float32),
+        "dones": np.frombuffer(buffers["dones"], dtype=np.bool_),
+    }
+
+
+def _worker(remote, parent_remote, buffers, n_envs, start, stop, seed, max_steps, action_repeat):
+    parent_remote.close()
+    env = DodgeVecEnv(n_envs=stop - start, seed=seed, max_steps=max_steps, action_repeat=action_repeat)
+    views = _array_views(buffers, n_envs)
+    actions = views["actions"][start:stop]
+    observations = views["observations"][start:stop]
+    terminal_observations = views["terminal_observations"][start:stop]
+    rewards = views["rewards"][start:stop]
+    dones = views["dones"][start:stop]
+
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == "step":
+                started = time.perf_counter()
+                obs, rewards[:], dones[:], infos = env.step(actions)
+                observations[:] = obs
+                for env_idx in np.flatnonzero(dones):
+                    terminal_observations[env_idx] = infos[env_idx]["terminal_observation"]
+                # Workers report how long their slice took, for straggler and latency metrics
+                remote.send(time.perf_counter() - started)
+            elif command == "reset":
+                if data is not None:
+                    env.seed(data)
+                observations[:] = env.reset()
+                remote.send(None)
+            elif command == "get_attr":
+                remote.send(env.get_attr(data))
+            elif command == "set_attr":
+                remote.send(env.set_attr(*data))
+            elif command == "env_method":
+                name, args, kwargs = data
+                remote.send(env.env_method(name, *args, **kwargs))
+            elif command == "close":
+                remote.close()
+                break
+    except KeyboardInterrupt:
+        pass
+
+
+class SharedMemoryVecEnv(VecEnv):
+    def __init__(self, n_envs, n_workers, start_method=None, seed=None, max_steps=10000, action_repeat=1):
+        n_workers = max(1, min(n_workers, n_envs))
+        ctx = mp.get_context(start_method)
+
+        self.buffers = {
+            "actions": ctx.RawArray("b", n_envs * 8),
+            "observations": ctx.RawArray("b", n_envs * OBSERVATION_SIZE * 4),
+            "terminal_observations": ctx.RawArray("b", n_envs * OBSERVATION_SIZE * 4),
+            "rewards": ctx.RawArray("b", n_envs * 4),
+            "dones": ctx.RawArray("b", n_envs),
+        }
+        views = _array_views(self.buffers, n_envs)
+        self.buf_actions = views["actions"]
+        self.buf_obs = views["observations"]
+        self.buf_terminal_obs = views["terminal_observations"]
+        self.buf_rews = views["rewards"]
+        self.buf_dones = views["dones"]
+
+        bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        self.slices = list(zip(bounds[:-1], bounds[1:]))
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_workers)])
+        self.processes = []
+        for worker_idx, (work_remote, remote) in enumerate(zip(self.work_remotes, self.remotes)):
+            start, stop = self.slices[worker_idx]
+            worker_seed = None if seed is None else seed + worker_idx
+            args = (work_remote, remote, self.buffers, n_envs, start, stop, worker_seed, max_steps, action_repeat)
+            process = ctx.Process(target=_worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.waiting = False
+        self.closed = False
+        self.worker_step_times = [0.0] * n_workers
+        self.remotes[0].send(("get_attr", "observation_space"))
+        observation_space = self.remotes[0].recv()[0]
+        self.remotes[0].send(("get_attr", "action_space"))
+        action_space = self.remotes[0].recv()[0]
+        super().__init__(n_envs, observation_space, action_space)
+
+    def step_async(self, actions):
+        self.buf_actions[:] = np.asarray(actions).reshape(self.num_envs)
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self):
+        self.worker_step_times = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+
+        dones = self.buf_dones.copy()
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        for env_idx in np.flatnonzero(dones):
+            infos[env_idx]["terminal_observation"] = self.buf_terminal_obs[env_idx].copy()
+        return self.buf_obs.copy(), self.buf_rews.copy(), dones, infos
+
+    def reset(self):
+        for worker_idx, remote in enumerate(self.remotes):
+            start, _ = self.slices[worker_idx]
+            remote.send(("reset", self._seeds[start]))
+        for remote in self.remotes:
+            remote.recv()
+        self._reset_seeds()
+        self._reset_options()
+        return self.buf_obs.copy()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def _worker_requests(self, indices):
+        requests = {}
+        for env_idx in self._get_indices(indices):
+            for worker_idx, (start, stop) in enumerate(self.slices):
+                if start <= env_idx < stop:
+                    requests.setdefault(worker_idx, []).append(env_idx - start)
+        return requests
+
+    def get_attr(self, attr_name, indices=None):
+        if attr_name == "render_mode":
+            return [None for _ in self._get_indices(indices)]
+        results = []
+        for worker_idx, local_indices in self._worker_requests(indices).items():
+            self.remotes[worker_idx].send(("get_attr", attr_name))
+            values = self.remotes[worker_idx].recv()
+            results.extend(values[i] for i in local_indices)
+        return results
+
+    def set_attr(self, attr_name, value, indices=None):
+        for worker_idx in self._worker_requests(indices):
+            self.remotes[worker_idx].send(("set_attr", (attr_name, value)))
+            self.remotes[worker_idx].recv()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        results = []
+        for worker_idx, local_indices in self._worker_requests(indices).items():
+            self.remotes[worker_idx].send(("env_method", (method_name, method_args, method_kwargs)))
+            values = self.remotes[worker_idx].recv()
+            results.extend(values[i] for i in local_indices)
+        return results
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
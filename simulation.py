@@ -0,0 +1,188 @@
+import random
+import numpy as np
+from config import *
+from spatial_index import GridIndex, GRID_THREAT_MIN_OBJECTS, scan_threats
+
+TRAINING_MAX_OBJECTS = 15
+TRAINING_SPAWN_CURRICULUM = ((1000, 60), (3000, 50))
+TRAINING_FINAL_SPAWN_RATE = 40
+
+
+def training_spawn_rate(steps):
+    for max_steps, spawn_rate in TRAINING_SPAWN_CURRICULUM:
+        if steps < max_steps:
+            return spawn_rate
+    return TRAINING_FINAL_SPAWN_RATE
+
+
+def to_pixel(value):
+    # pygame.Rect attribute assignment rounds half away from zero
+    if value < 0:
+        return -int(-value + 0.5)
+    return int(value + 0.5)
+
+
+def pixel_positions(values):
+    # Vectorized to_pixel
+    return np.copysign(np.floor(np.abs(values) + 0.5), values).astype(np.int64)
+
+
+def collision_winner(first_hit, second_hit):
+    # Takes first_collision() serials for two players and returns the index of
+    # the winner, or None while both are clear. Objects are checked in spawn
+    # order, so the later of the two hits decides the winner.
+    if first_hit < 0 and second_hit < 0:
+        return None
+    return 1 if first_hit > second_hit else 0
+
+
+def object_arrays(falling_objects):
+    # Array-backed collections (storm.StormObjects) hand over their columns directly
+    arrays = getattr(falling_objects, "arrays", None)
+    if arrays is not None:
+        return arrays()
+    count = len(falling_objects)
+    x = np.fromiter((obj.x for obj in falling_objects), dtype=np.float64, count=count)
+    y = np.fromiter((obj.y for obj in falling_objects), dtype=np.float64, count=count)
+    size = np.fromiter((obj.size for obj in falling_objects), dtype=np.float64, count=count)
+    speed = np.fromiter((obj.speed for obj in falling_objects), dtype=np.float64, count=count)
+    return x, y, size, speed
+
+
+class FallingObject:
+    __slots__ = ("size", "x", "y", "speed", "serial", "first_column", "row", "row_end")
+
+    def __init__(self, rng=random):
+        self.spawn(rng)
+
+    def spawn(self, rng=random):
+        self.size = rng.randint(OBJECT_MIN_SIZE, OBJECT_MAX_SIZE)
+        self.x = rng.randint(0, SCREEN_WIDTH - self.size)
+        self.y = -self.size
+        self.speed = rng.uniform(OBJECT_MIN_SPEED, OBJECT_MAX_SPEED)
+
+    def update(self):
+        self.y += self.speed
+
+    def is_off_screen(self):
+        return self.y > SCREEN_HEIGHT
+
+    def overlaps(self, x, y, width, height, snap_to_pixels=False):
+        obj_y = to_pixel(self.y) if snap_to_pixels else self.y
+        return (x < self.x + self.size and
+                x + width > self.x and
+                y < obj_y + self.size and
+                y + height > obj_y)
+
+
+class ObjectPool:
+    # Recycles despawned objects so a running world stops allocating.
+    # Instances are created without __init__ so prefilling draws no random numbers.
+    def __init__(self, object_factory=FallingObject, capacity=OBJECT_POOL_CAPACITY):
+        self.object_factory = object_factory
+        self.free = [object_factory.__new__(object_factory) for _ in range(capacity)]
+        self.allocations = capacity
+        self.reuses = 0
+
+    def acquire(self, rng):
+        if self.free:
+            obj = self.free.pop()
+            self.reuses += 1
+        else:
+            obj = self.object_factory.__new__(self.object_factory)
+            self.allocations += 1
+        obj.spawn(rng)
+        return obj
+
+    def release(self, obj):
+        self.free.append(obj)
+
+
+class ObjectList(list):
+    # A World's live objects in spawn order. It carries the world's index, so
+    # code handed only the objects (players, observation encoders) can query it.
+    __slots__ = ("index",)
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+
+    def nearest_threats(self, y_limit, k):
+        if len(self) < GRID_THREAT_MIN_OBJECTS:
+            return scan_threats(self, y_limit, k)
+        return self.index.nearest_threats(y_limit, k)
+
+
+class World:
+    def __init__(self, object_factory=FallingObject, max_objects=None, rng=None):
+        self.object_factory = object_factory
+        self.max_objects = max_objects
+        self.rng = rng if rng is not None else random
+        self.pool = ObjectPool(object_factory, max_objects or OBJECT_POOL_CAPACITY)
+        self.index = GridIndex()
+        self.falling_objects = ObjectList(self.index)
+        self.frame_count = 0
+        self.spawn_count = 0
+
+    def reset(self):
+        for obj in self.falling_objects:
+            self.pool.release(obj)
+        self.falling_objects.clear()
+        self.index.clear()
+        self.frame_count = 0
+
+    def spawn(self, spawn_rate=OBJECT_SPAWN_RATE):
+        self.frame_count += 1
+        if self.frame_count % spawn_rate != 0:
+            return
+        if self.max_objects is not None and len(self.falling_objects) >= self.max_objects:
+            return
+        obj = self.pool.acquire(self.rng)
+        obj.serial = self.spawn_count
+        self.spawn_count += 1
+        self.falling_objects.append(obj)
+        self.index.insert(obj)
+
+    def advance(self):
+        # Compact in place so falling_objects stays the same list object
+        objects = self.falling_objects
+        kept = 0
+        for obj in objects:
+            obj.update()
+            if obj.is_off_screen():
+                self.index.remove(obj)
+                self.pool.release(obj)
+            else:
+                if obj.y >= obj.row_end:
+                    self.index.moved(obj)
+                objects[kept] = obj
+                kept += 1
+        del objects[kept:]
+
+    def allocation_stats(self):
+        return {
+            "allocations": self.pool.allocations,
+            "reuses": self.pool.reuses,
+            "active": len(self.falling_objects),
+            "free": len(self.pool.free),
+        }
+
+    def step(self, spawn_rate=OBJECT_SPAWN_RATE):
+        self.spawn(spawn_rate)
+        self.advance()
+
+    def first_collision(self, x, y, width, height, snap_to_pixels=False):
+        # Returns the spawn serial of the oldest overlapping object, or -1
+        hits = self.index.overlapping(x, y, width, height, snap_to_pixels)
+        if not hits:
+            return -1
+        return min(obj.serial for obj in hits)
+
+    def collides(self, x, y, width, height, snap_to_pixels=False):
+        return self.index.any_overlapping(x, y, width, height, snap_to_pixels)
+
+    def in_band(self, y_min, y_max, x_min, x_max):
+        return self.index.in_band(y_min, y_max, x_min, x_max)
+
+    def nearest_threats(self, y_limit, k):
+        return self.falling_objects.nearest_threats(y_limit, k)
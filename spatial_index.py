@@ -0,0 +1,144 @@
+import heapq
+from config import *
+
+BROADPHASE_COLUMN_WIDTH = 64
+BROADPHASE_ROW_HEIGHT = 64
+# Below this many objects a plain scan finds threats faster than walking the grid's rows
+GRID_THREAT_MIN_OBJECTS = 8
+# Objects spawn with their top at -size, so row 0 starts above the screen
+ROW_ORIGIN = -OBJECT_MAX_SIZE
+
+
+def threat_key(obj):
+    # Vertical distance to the floor as the observation stores it; ties go to the older object
+    return (SCREEN_HEIGHT - obj.y) / SCREEN_HEIGHT, obj.serial
+
+
+def nearest_threats(falling_objects, y_limit, k):
+    # The k objects above y_limit closest to the floor, nearest first. Collections
+    # with an index (World's objects) answer from it; plain lists are filtered.
+    query = getattr(falling_objects, "nearest_threats", None)
+    if query is not None:
+        return query(y_limit, k)
+    return scan_threats(falling_objects, y_limit, k)
+
+
+def scan_threats(falling_objects, y_limit, k):
+    # nsmallest is stable, so ties keep list (spawn) order as threat_key does
+    candidates = [obj for obj in falling_objects if obj.y < y_limit]
+    return heapq.nsmallest(k, candidates, key=lambda obj: (SCREEN_HEIGHT - obj.y) / SCREEN_HEIGHT)
+
+
+class GridIndex:
+    # Buckets objects by column and by the row holding their top edge. Objects
+    # only fall, so each stays in its columns for life and changes row every
+    # few dozen ticks; queries visit only the cells near the area they ask about.
+    # Each row also lists its objects once, so threat searches skip empty rows
+    # without looking at their cells.
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT,
+                 column_width=BROADPHASE_COLUMN_WIDTH, row_height=BROADPHASE_ROW_HEIGHT):
+        self.column_width = column_width
+        self.row_height = row_height
+        self.column_count = width // column_width + 1
+        self.row_count = (height - ROW_ORIGIN) // row_height + 1
+        self.cells = [[[] for _ in range(self.column_count)] for _ in range(self.row_count)]
+        self.rows = [[] for _ in range(self.row_count)]
+        # y at which an object leaves each row; the last row extends past the floor
+        self.row_ends = [ROW_ORIGIN + (row + 1) * row_height for row in range(self.row_count)]
+        self.row_ends[-1] = float("inf")
+
+    def clear(self):
+        for row in self.cells:
+            for cell in row:
+                cell.clear()
+        for objects in self.rows:
+            objects.clear()
+
+    def _column_range(self, x_min, x_max):
+        last = self.column_count - 1
+        first = int(x_min) // self.column_width
+        end = int(x_max) // self.column_width
+        first = 0 if first < 0 else (first if first < last else last)
+        end = 0 if end < 0 else (end if end < last else last)
+        return first, end
+
+    def _row(self, y):
+        row = int((y - ROW_ORIGIN) // self.row_height)
+        last = self.row_count - 1
+        return 0 if row < 0 else (row if row < last else last)
+
+    def insert(self, obj):
+        first, end = self._column_range(obj.x, obj.x + obj.size - 1)
+        obj.first_column = first
+        obj.row = self._row(obj.y)
+        obj.row_end = self.row_ends[obj.row]
+        self.rows[obj.row].append(obj)
+        row = self.cells[obj.row]
+        for column in range(first, end + 1):
+            row[column].append(obj)
+
+    def remove(self, obj):
+        first, end = self._column_range(obj.x, obj.x + obj.size - 1)
+        self.rows[obj.row].remove(obj)
+        row = self.cells[obj.row]
+        for column in range(first, end + 1):
+            row[column].remove(obj)
+
+    def moved(self, obj):
+        # Call after obj.y changes; only crossing into another row touches the
+        # buckets. Falling objects can skip the call while obj.y < obj.row_end.
+        if self._row(obj.y) != obj.row:
+            self.remove(obj)
+            self.insert(obj)
+
+    def objects_in(self, x_min, x_max, y_min, y_max):
+        # Objects whose columns meet [x_min, x_max] and whose top lies in the rows
+        # covering [y_min, y_max], each once; callers still test exact bounds
+        first, end = self._column_range(x_min, x_max)
+        for row in range(self._row(y_min), self._row(y_max) + 1):
+            objects = self.rows[row]
+            if len(objects) <= end - first + 1:
+                # A sparse row is cheaper to scan whole than cell by cell
+                yield from objects
+                continue
+            cells = self.cells[row]
+            for column in range(first, end + 1):
+                for obj in cells[column]:
+                    # Objects spanning several columns are reported from the first one queried
+                    if column == first or obj.first_column == column:
+                        yield obj
+
+    def overlapping(self, x, y, width, height, snap_to_pixels=False):
+        # The 1 px margins on the pre-filter cover snapping to pixels
+        top, bottom = y - 1, y + height + 1
+        return [obj for obj in self.objects_in(x, x + width, top - OBJECT_MAX_SIZE, bottom)
+                if obj.y < bottom and obj.y + obj.size > top and obj.overlaps(x, y, width, height, snap_to_pixels)]
+
+    def any_overlapping(self, x, y, width, height, snap_to_pixels=False):
+        top, bottom = y - 1, y + height + 1
+        for obj in self.objects_in(x, x + width, top - OBJECT_MAX_SIZE, bottom):
+            if obj.y < bottom and obj.y + obj.size > top and obj.overlaps(x, y, width, height, snap_to_pixels):
+                return True
+        return False
+
+    def in_band(self, y_min, y_max, x_min, x_max):
+        return [obj for obj in self.objects_in(x_min, x_max, y_min, y_max)
+                if y_min < obj.y < y_max and obj.x <= x_max and obj.x + obj.size > x_min]
+
+    def nearest_threats(self, y_limit, k):
+        # Walks rows upwards from y_limit and stops once the k-th nearest object
+        # so far is strictly closer than anything in the rows not yet visited
+        first = self._row(y_limit)
+        found = [obj for obj in self.rows[first] if obj.y < y_limit]
+        for row in range(first, -1, -1):
+            if row != first:
+                objects = self.rows[row]
+                if not objects:
+                    continue
+                found += objects
+            if len(found) >= k:
+                found = heapq.nsmallest(k, found, key=threat_key)
+                row_top = ROW_ORIGIN + row * self.row_height
+                if threat_key(found[-1])[0] < (SCREEN_HEIGHT - row_top) / SCREEN_HEIGHT:
+                    return found
+        return heapq.nsmallest(k, found, key=threat_key)
@@ -0,0 +1,153 @@
+import numpy as np
+from config import *
+from simulation import pixel_positions
+
+
+def parse_spawn_curve(text):
+    # "0:10,600:40" -> ((0, 10.0), (600, 40.0))
+    points = []
+    for point in text.split(","):
+        tick, rate = point.split(":")
+        points.append((int(tick), float(rate)))
+    return tuple(sorted(points))
+
+
+def spawn_rate(curve, tick):
+    # Objects per tick, linear between curve points and flat after the last one
+    ticks, rates = zip(*curve)
+    return float(np.interp(tick, ticks, rates))
+
+
+class StormObject:
+    __slots__ = ("x", "y", "size", "speed", "serial")
+
+    def __init__(self, x, y, size, speed, serial):
+        self.x = x
+        self.y = y
+        self.size = size
+        self.speed = speed
+        self.serial = serial
+
+
+class StormObjects:
+    # Read-only sequence over a StormWorld. Code that knows about arrays calls
+    # arrays(); everything else iterates and gets StormObject snapshots.
+    def __init__(self, world):
+        self.world = world
+
+    @property
+    def max_objects(self):
+        # Lets observation.GameEncoder size its slots once instead of growing with the storm
+        return self.world.max_objects
+
+    def arrays(self):
+        count = self.world.count
+        return (self.world.x[:count], self.world.y[:count],
+                self.world.size[:count], self.world.speed[:count])
+
+    def __len__(self):
+        return self.world.count
+
+    def __bool__(self):
+        return self.world.count > 0
+
+    def __getitem__(self, index):
+        count = self.world.count
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(index)
+        world = self.world
+        return StormObject(float(world.x[index]), float(world.y[index]), int(world.size[index]),
+                           float(world.speed[index]), int(world.serial[index]))
+
+    def __iter__(self):
+        count = self.world.count
+        world = self.world
+        return map(StormObject, world.x[:count].tolist(), world.y[:count].tolist(),
+                   world.size[:count].astype(np.int64).tolist(), world.speed[:count].tolist(),
+                   world.serial[:count].tolist())
+
+    def __reversed__(self):
+        # Newest first, so spawn-order scans can stop early without converting everything
+        count = self.world.count
+        return (self[index] for index in range(count - 1, -1, -1))
+
+
+class StormWorld:
+    # Struct-of-arrays World for thousands of objects. Same physics, spawn
+    # order and collision rule as simulation.World, with one NumPy pass per tick.
+    def __init__(self, max_objects=STORM_MAX_OBJECTS, spawn_curve=STORM_SPAWN_CURVE, seed=None):
+        self.max_objects = max_objects
+        self.spawn_curve = spawn_curve
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(max_objects)
+        self.y = np.zeros(max_objects)
+        self.size = np.zeros(max_objects)
+        self.speed = np.zeros(max_objects)
+        self.serial = np.zeros(max_objects, dtype=np.int64)
+        self.count = 0
+        self.frame_count = 0
+        self.spawn_count = 0
+        self.spawn_credit = 0.0
+        self.falling_objects = StormObjects(self)
+
+    def reset(self):
+        self.count = 0
+        self.frame_count = 0
+        self.spawn_credit = 0.0
+
+    def spawn(self):
+        self.frame_count += 1
+        self.spawn_credit += spawn_rate(self.spawn_curve, self.frame_count)
+        new = min(int(self.spawn_credit), self.max_objects - self.count)
+        self.spawn_credit -= int(self.spawn_credit)
+        if new <= 0:
+            return
+
+        start, end = self.count, self.count + new
+        size = self.rng.integers(OBJECT_MIN_SIZE, OBJECT_MAX_SIZE + 1, new)
+        self.size[start:end] = size
+        self.x[start:end] = self.rng.integers(0, SCREEN_WIDTH - size + 1)
+        self.y[start:end] = -size
+        self.speed[start:end] = self.rng.uniform(OBJECT_MIN_SPEED, OBJECT_MAX_SPEED, new)
+        self.serial[start:end] = np.arange(self.spawn_count, self.spawn_count + new)
+        self.spawn_count += new
+        self.count = end
+
+    def advance(self):
+        count = self.count
+        y = self.y[:count]
+        y += self.speed[:count]
+        kept = np.flatnonzero(y <= SCREEN_HEIGHT)
+        if len(kept) == count:
+            return
+        # Compact the survivors to the front, keeping spawn order
+        for array in (self.x, self.y, self.size, self.speed, self.serial):
+            array[:len(kept)] = array[kept]
+        self.count = len(kept)
+
+    def step(self):
+        self.spawn()
+        self.advance()
+
+    def overlapping(self, x, y, width, height, snap_to_pixels=False):
+        count = self.count
+        obj_x, obj_size = self.x[:count], self.size[:count]
+        obj_y = pixel_positions(self.y[:count]) if snap_to_pixels else self.y[:count]
+        return np.flatnonzero((x < obj_x + obj_size) & (x + width > obj_x) &
+                              (y < obj_y + obj_size) & (y + height > obj_y))
+
+    def first_collision(self, x, y, width, height, snap_to_pixels=False):
+        # Spawn serial of the oldest overlapping object, or -1
+        hits = self.overlapping(x, y, width, height, snap_to_pixels)
+        if not len(hits):
+            return -1
+        return int(self.serial[hits[0]])
+
+    def collides(self, x, y, width, height, snap_to_pixels=False):
+        return len(self.overlapping(x, y, width, height, snap_to_pixels)) > 0
+
+    def allocation_stats(self):
+        return {"allocations": self.max_objects, "reuses": 0, "active": self.count,
+                "free": self.max_objects - self.count}
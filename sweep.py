@@ -0,0 +1,207 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import random
+import shutil
+import time
+
+SWEEP_TRIALS = 16
+SWEEP_MIN_TIMESTEPS = 25000
+SWEEP_MAX_TIMESTEPS = 400000
+SWEEP_ETA = 2
+SWEEP_EVAL_MATCHES = 20
+SWEEP_EVAL_MAX_TICKS = 5000
+SWEEP_N_ENVS = 8
+
+# Each entry is a fixed value or {"choice": [...]}, {"uniform": [low, high]}
+# or {"log_uniform": [low, high]}. Keys in ENV_PARAMS configure the training
+# env, everything else is passed to PPO.
+SWEEP_SPACE = {
+    "learning_rate": {"log_uniform": [3e-5, 1e-3]},
+    "n_steps": {"choice": [128, 256, 512]},
+    "batch_size": {"choice": [64, 128, 256]},
+    "n_epochs": {"choice": [5, 10]},
+    "gamma": {"choice": [0.98, 0.99, 0.995]},
+    "gae_lambda": {"choice": [0.9, 0.95, 0.98]},
+    "clip_range": {"choice": [0.1, 0.2, 0.3]},
+    "ent_coef": {"log_uniform": [1e-4, 0.05]},
+    "action_repeat": {"choice": [1, 2, 4]},
+}
+ENV_PARAMS = ("n_envs", "action_repeat", "frame_stack")
+
+
+def sample_params(space, rng):
+    params = {}
+    for name, spec in space.items():
+        if not isinstance(spec, dict):
+            params[name] = spec
+        elif "choice" in spec:
+            params[name] = rng.choice(spec["choice"])
+        elif "uniform" in spec:
+            params[name] = rng.uniform(*spec["uniform"])
+        elif "log_uniform" in spec:
+            low, high = spec["log_uniform"]
+            params[name] = math.exp(rng.uniform(math.log(low), math.log(high)))
+        else:
+            raise ValueError(f"unknown search space entry for {name}: {spec}")
+    return params
+
+
+def milestones(min_timesteps, max_timesteps, eta):
+    # Timesteps at which every surviving trial is evaluated: min, min*eta, ... and max
+    rungs = []
+    timesteps = min_timesteps
+    while timesteps < max_timesteps:
+        rungs.append(timesteps)
+        timesteps *= eta
+    rungs.append(max_timesteps)
+    return rungs
+
+
+def run_trial(job):
+    # Trains one trial up to `timesteps` from its last checkpoint, then scores it
+    trial, timesteps, settings = job
+    import torch
+    from stable_baselines3 import PPO
+    from evaluate import score_policy
+    from numpy_policy import export_policy
+    from train_ai import make_training_env
+    from training_metrics import TrainingMetricsCallback
+
+    torch.set_num_threads(settings["threads"])
+    started = time.perf_counter()
+    params = dict(trial["params"])
+    env_params = {name: params.pop(name) for name in ENV_PARAMS if name in params}
+    action_repeat = env_params.get("action_repeat", 1)
+    vec_env = make_training_env(env_params.get("n_envs", SWEEP_N_ENVS), 0,
+                                action_repeat=action_repeat, frame_stack=env_params.get("frame_stack", 1))
+    vec_env.seed(trial["seed"])
+
+    os.makedirs(trial["dir"], exist_ok=True)
+    model_path = os.path.join(trial["dir"], "model")
+    if os.path.exists(f"{model_path}.zip"):
+        model = PPO.load(model_path, env=vec_env, device="cpu")
+    else:
+        model = PPO("MlpPolicy", vec_env, verbose=0, seed=trial["seed"], device="cpu",
+                    tensorboard_log=settings["log_dir"], **params)
+    try:
+        model.learn(total_timesteps=timesteps - model.num_timesteps, callback=TrainingMetricsCallback(action_repeat),
+                    tb_log_name=f"trial_{trial['id']:03d}", reset_num_timesteps=False)
+    finally:
+        vec_env.close()
+    model.save(model_path)
+
+    # One exported policy per rung, so evaluation never sees a cached older one
+    policy_path = export_policy(model_path, os.path.join(trial["dir"], f"rung_{timesteps}.npz"), action_repeat)
+    score, win_rate = score_policy(policy_path, settings["eval_matches"], settings["eval_max_ticks"])
+    return {
+        "id": trial["id"],
+        "timesteps": int(model.num_timesteps),
+        "score": score,
+        "win_rate": win_rate,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def write_results(path, trials, rungs):
+    with open(path, "w") as f:
+        json.dump({"milestones": rungs, "trials": trials}, f, indent=2)
+
+
+def run_sweep(space=SWEEP_SPACE, n_trials=SWEEP_TRIALS, parallel=None, min_timesteps=SWEEP_MIN_TIMESTEPS,
+              max_timesteps=SWEEP_MAX_TIMESTEPS, eta=SWEEP_ETA, eval_matches=SWEEP_EVAL_MATCHES,
+              eval_max_ticks=SWEEP_EVAL_MAX_TICKS, seed=0, name=None):
+    # Synchronous successive halving: every surviving trial trains to the next
+    # milestone, and only the best 1/eta of them continue to the one after.
+    cpu_count = os.cpu_count() or 1
+    parallel = parallel or cpu_count
+    name = name or time.strftime("%Y%m%d-%H%M%S")
+    model_dir = os.path.join("models", "sweep", name)
+    log_dir = os.path.join("logs", "sweep", name)
+    os.makedirs(model_dir, exist_ok=True)
+    os.makedirs(log_dir, exist_ok=True)
+    results_path = os.path.join(log_dir, "results.json")
+
+    rng = random.Random(seed)
+    trials = [{
+        "id": index,
+        "params": sample_params(space, rng),
+        "seed": seed + index,
+        "dir": os.path.join(model_dir, f"trial_{index:03d}"),
+        "rungs": [],
+        "stopped_at": None,
+    } for index in range(n_trials)]
+    rungs = milestones(min_timesteps, max_timesteps, eta)
+    alive = list(trials)
+
+    print(f"Sweep {name}: {n_trials} trials, milestones {rungs}, up to {parallel} trials at a time")
+    for rung, timesteps in enumerate(rungs):
+        workers = min(parallel, len(alive))
+        # Each trial's torch gets an equal share of the cores
+        settings = {"threads": max(1, cpu_count // workers), "log_dir": log_dir,
+                    "eval_matches": eval_matches, "eval_max_ticks": eval_max_ticks}
+        jobs = [(trial, timesteps, settings) for trial in alive]
+        started = time.perf_counter()
+        with mp.get_context().Pool(workers, maxtasksperchild=1) as pool:
+            results = pool.map(run_trial, jobs, chunksize=1)
+
+        by_id = {trial["id"]: trial for trial in alive}
+        for result in results:
+            by_id[result["id"]]["rungs"].append(result)
+        alive.sort(key=lambda trial: trial["rungs"][-1]["score"], reverse=True)
+
+        print(f"\nMilestone {timesteps} timesteps ({time.perf_counter() - started:.0f}s)")
+        print(f"{'trial':>6s} {'survival':>9s} {'win rate':>9s}  params")
+        for trial in alive:
+            latest = trial["rungs"][-1]
+            params = ", ".join(f"{key}={value:.3g}" if isinstance(value, float) else f"{key}={value}"
+                               for key, value in trial["params"].items())
+            print(f"{trial['id']:6d} {latest['score']:9.0f} {latest['win_rate']:9.1%}  {params}")
+
+        if rung < len(rungs) - 1:
+            keep = max(1, math.ceil(len(alive) / eta))
+            for trial in alive[keep:]:
+                trial["stopped_at"] = timesteps
+            alive = alive[:keep]
+        write_results(results_path, trials, rungs)
+
+    best = alive[0]
+    best_path = os.path.join("models", f"sweep_{name}_best")
+    shutil.copyfile(os.path.join(best["dir"], "model.zip"), f"{best_path}.zip")
+    shutil.copyfile(os.path.join(best["dir"], f"rung_{rungs[-1]}.npz"), f"{best_path}.npz")
+    with open(os.path.join(log_dir, "best_params.json"), "w") as f:
+        json.dump(best["params"], f, indent=2)
+
+    trained = sum(trial["rungs"][-1]["timesteps"] for trial in trials)
+    print(f"\nBest: trial {best['id']} with mean survival {best['rungs'][-1]['score']:.0f} ticks")
+    print(f"Checkpoint: {best_path}.zip (+ .npz), results: {results_path}")
+    print(f"Trained {trained} timesteps in total, {n_trials * max_timesteps} without early stopping")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel PPO hyperparameter sweep with successive halving")
+    parser.add_argument("--space", default=None, help="search space JSON file (default: SWEEP_SPACE in sweep.py)")
+    parser.add_argument("--trials", type=int, default=SWEEP_TRIALS, help=f"sampled configurations (default: {SWEEP_TRIALS})")
+    parser.add_argument("--parallel", type=int, default=None, help="trials trained at once (default: one per CPU core)")
+    parser.add_argument("--min-timesteps", type=int, default=SWEEP_MIN_TIMESTEPS, help="first milestone")
+    parser.add_argument("--max-timesteps", type=int, default=SWEEP_MAX_TIMESTEPS, help="last milestone")
+    parser.add_argument("--eta", type=int, default=SWEEP_ETA, help="milestone growth and 1/eta of trials kept per milestone")
+    parser.add_argument("--eval-matches", type=int, default=SWEEP_EVAL_MATCHES, help="scoring matches against the heuristic AI")
+    parser.add_argument("--eval-max-ticks", type=int, default=SWEEP_EVAL_MAX_TICKS, help="survival cap per scoring match")
+    parser.add_argument("--seed", type=int, default=0, help="seed for sampling and training")
+    parser.add_argument("--name", default=None, help="sweep name for models/sweep/ and logs/sweep/ (default: timestamp)")
+    args = parser.parse_args()
+
+    space = SWEEP_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    run_sweep(space, args.trials, args.parallel, args.min_timesteps, args.max_timesteps, args.eta,
+              args.eval_matches, args.eval_max_ticks, args.seed, args.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,83 @@
+import argparse
+import math
+import multiprocessing as mp
 import numpy as np
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
-from training_env import DodgeGameEnv
+from stable_baselines3.common.vec_env import VecFrameStack, VecMonitor
+from vec_env import DodgeVecEnv
+from training_metrics import TimedVecEnv, TrainingMetricsCallback
+from checkpointing import (AsyncCheckpointCallback, latest_checkpoint, CHECKPOINT_EVAL_MATCHES,
+                           CHECKPOINT_FREQ, CHECKPOINT_KEEP)
+from self_play_env import (SelfPlayVecEnv, SelfPlayCallback, SELF_PLAY_ENVS, SELF_PLAY_POOL_FREQ,
+                           SELF_PLAY_POOL_SIZE)
 import os
 
-def train_ai():
+ENVS_PER_WORKER = 8
+ROLLOUT_SIZE = 4096
+BATCH_SIZE = 128
+
+def rollout_steps(n_envs, rollout_size=ROLLOUT_SIZE, batch_size=BATCH_SIZE):
+    # Fewest steps per env that collect rollout_size samples, rounded up so the
+    # rollout splits into whole minibatches when that costs at most one more
+    # minibatch: 16 x 256 envs, 88 x 48 envs, 41 x 100 envs (one short minibatch)
+    n_steps = math.ceil(rollout_size / n_envs)
+    step = batch_size // math.gcd(batch_size, n_envs)
+    whole = math.ceil(n_steps / step) * step
+    return whole if (whole - n_steps) * n_envs <= batch_size else n_steps
+
+def make_training_env(n_envs, workers, start_method=None, action_repeat=1, frame_stack=1,
+                      self_play=False, opponents=(), pool_size=SELF_PLAY_POOL_SIZE):
+    if self_play:
+        # Both players share each match's objects, so matches step in-process like DodgeVecEnv
+        from numpy_policy import load_policy
+        vec_env = SelfPlayVecEnv(n_envs=n_envs, action_repeat=action_repeat, pool_size=pool_size)
+        for path in opponents:
+            vec_env.add_opponent(load_policy(path, action_repeat))
+    elif workers == 0:
+        vec_env = DodgeVecEnv(n_envs=n_envs, action_repeat=action_repeat)
+    else:
+        from shm_vec_env import SharedMemoryVecEnv
+        vec_env = SharedMemoryVecEnv(n_envs, workers, start_method=start_method, action_repeat=action_repeat)
+
+    vec_env = TimedVecEnv(vec_env)
+    if frame_stack > 1:
+        vec_env = VecFrameStack(vec_env, frame_stack)
+    return VecMonitor(vec_env)
+
+def train_ai(n_envs=4, workers=0, start_method=None, n_steps=None,
+             total_timesteps=500000, warm_start=False, bc_samples=None, action_repeat=1, frame_stack=1,
+             checkpoint_freq=CHECKPOINT_FREQ, keep_checkpoints=CHECKPOINT_KEEP,
+             eval_matches=CHECKPOINT_EVAL_MATCHES, resume=False, self_play=False, opponents=(),
+             pool_size=SELF_PLAY_POOL_SIZE, pool_freq=SELF_PLAY_POOL_FREQ):
     model_dir = "models"
     model_path = os.path.join(model_dir, "dodge_game_ppo")
-    
+
     if not os.path.exists(model_dir):
         os.makedirs(model_dir)
-    
-    print("Creating training environment...")
-    vec_env = make_vec_env(DodgeGameEnv, n_envs=4)
-    
+
+    # Keep the samples per PPO update close to the original 4 envs x 1024 steps
+    if n_steps is None:
+        n_steps = rollout_steps(n_envs)
+
+    if self_play:
+        print(f"Creating self-play environment ({n_envs} matches, action repeat {action_repeat}, "
+              f"{len(opponents)} initial opponents, pool of {pool_size})...")
+    else:
+        print(f"Creating training environment ({n_envs} envs, {workers} worker processes, "
+              f"action repeat {action_repeat}, frame stack {frame_stack})...")
+    vec_env = make_training_env(n_envs, workers, start_method, action_repeat, frame_stack,
+                                self_play, opponents, pool_size)
+    print(f"Rollout: {n_steps} steps x {n_envs} envs = {n_steps * n_envs} samples per update")
+
+    # After a crash, continue from the newest periodic checkpoint
+    resume_path = latest_checkpoint() if resume else None
+    if resume_path is not None:
+        print(f"Resuming from checkpoint {resume_path}.zip...")
+        model = PPO.load(resume_path, env=vec_env, n_steps=n_steps)
     # Check if model exists and load it
-    if os.path.exists(f"{model_path}.zip"):
+    elif os.path.exists(f"{model_path}.zip"):
         print("Loading existing model to continue training...")
-        model = PPO.load(model_path, env=vec_env)
+        model = PPO.load(model_path, env=vec_env, n_steps=n_steps)
         print("Existing model loaded successfully!")
     else:
         print("No existing model found. Starting fresh training...")
@@ -25,8 +85,8 @@ def train_ai():
             "MlpPolicy",
             vec_env,
             learning_rate=1e-4,
-            n_steps=1024,
-            batch_size=128,
+            n_steps=n_steps,
+            batch_size=BATCH_SIZE,
             n_epochs=10,
             gamma=0.99,
             gae_lambda=0.95,
@@ -36,12 +96,92 @@ def train_ai():
             tensorboard_log="./logs/",
         )
 
-    total_timesteps = 500000
+        if warm_start:
+            # Pretrain on the scripted AI's decisions so PPO only has to fine-tune
+            from behavior_cloning import warm_start as behavior_clone, BC_SAMPLES
+            behavior_clone(model, n_samples=bc_samples or BC_SAMPLES, workers=max(workers, 1),
+                           action_repeat=action_repeat, frame_stack=frame_stack)
+
+    callbacks = [TrainingMetricsCallback(action_repeat)]
+    if self_play:
+        callbacks.append(SelfPlayCallback(pool_freq))
+    if checkpoint_freq > 0:
+        callbacks.append(AsyncCheckpointCallback(checkpoint_freq, keep=keep_checkpoints, action_repeat=action_repeat,
+                                                 eval_matches=eval_matches))
+
     print(f"Training for {total_timesteps} more timesteps...")
-    model.learn(total_timesteps=total_timesteps, progress_bar=True, reset_num_timesteps=False)
-    
+    try:
+        model.learn(total_timesteps=total_timesteps, callback=callbacks,
+                    progress_bar=True, reset_num_timesteps=False)
+    finally:
+        vec_env.close()
+
     model.save(model_path)
     print(f"Model saved to {model_path}")
 
+    from numpy_policy import export_policy
+    print(f"Policy weights exported to {export_policy(model_path, action_repeat=action_repeat)}")
+
+def parse_args():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Train the PPO dodge AI")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"env worker processes, 0 steps every env in the learner process (default: {cpu_count})")
+    parser.add_argument("--n-envs", type=int, default=None,
+                        help=f"parallel envs (default: {ENVS_PER_WORKER} per worker, 4 without workers, "
+                             f"{SELF_PLAY_ENVS} with --self-play)")
+    parser.add_argument("--start-method", choices=mp.get_all_start_methods(), default=None,
+                        help="multiprocessing start method for the workers")
+    parser.add_argument("--n-steps", type=int, default=None,
+                        help=f"steps per env per rollout (default: about {ROLLOUT_SIZE} samples over all envs)")
+    parser.add_argument("--timesteps", type=int, default=500000,
+                        help="PPO timesteps for this run (default: 500000)")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="behavior-clone the heuristic AI before PPO when starting a fresh model")
+    parser.add_argument("--bc-samples", type=int, default=None,
+                        help="heuristic decisions to collect for --warm-start (default: 200000)")
+    parser.add_argument("--action-repeat", type=int, default=1,
+                        help="physics ticks per policy decision, rewards are summed (default: 1)")
+    parser.add_argument("--frame-stack", type=int, default=1,
+                        help="stack this many consecutive observations for velocity information (default: 1)")
+    parser.add_argument("--checkpoint-freq", type=int, default=CHECKPOINT_FREQ,
+                        help=f"timesteps between background checkpoints, 0 disables them (default: {CHECKPOINT_FREQ})")
+    parser.add_argument("--keep-checkpoints", type=int, default=CHECKPOINT_KEEP,
+                        help=f"recent checkpoints to keep (default: {CHECKPOINT_KEEP})")
+    parser.add_argument("--eval-matches", type=int, default=CHECKPOINT_EVAL_MATCHES,
+                        help=f"seeded matches scoring each checkpoint, 0 disables evaluation (default: {CHECKPOINT_EVAL_MATCHES})")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the newest checkpoint in models/checkpoints")
+    parser.add_argument("--self-play", action="store_true",
+                        help="train in two-player matches against a pool of frozen past policies")
+    parser.add_argument("--opponents", nargs="+", default=[], metavar="PATH",
+                        help="policies (.npz or .zip) to seed the self-play pool, e.g. models/checkpoints/*.npz")
+    parser.add_argument("--pool-size", type=int, default=SELF_PLAY_POOL_SIZE,
+                        help=f"frozen opponents kept for self-play (default: {SELF_PLAY_POOL_SIZE})")
+    parser.add_argument("--pool-freq", type=int, default=SELF_PLAY_POOL_FREQ,
+                        help=f"timesteps between adding the learner to the pool (default: {SELF_PLAY_POOL_FREQ})")
+    args = parser.parse_args()
+
+    if args.self_play:
+        if args.frame_stack > 1:
+            parser.error("--self-play opponents see single observations, so it needs --frame-stack 1")
+        if args.workers:
+            parser.error("--self-play steps its matches in the learner process, so it takes no --workers")
+        args.workers = 0
+        if args.n_envs is None:
+            args.n_envs = SELF_PLAY_ENVS
+    elif args.workers is None:
+        args.workers = cpu_count
+
+    if args.n_envs is None:
+        args.n_envs = args.workers * ENVS_PER_WORKER if args.workers > 0 else 4
+    return args
+
 if __name__ == "__main__":
-    train_ai()
+    args = parse_args()
+    train_ai(n_envs=args.n_envs, workers=args.workers, start_method=args.start_method, n_steps=args.n_steps,
+             total_timesteps=args.timesteps, warm_start=args.warm_start, bc_samples=args.bc_samples,
+             action_repeat=args.action_repeat, frame_stack=args.frame_stack,
+             checkpoint_freq=args.checkpoint_freq, keep_checkpoints=args.keep_checkpoints,
+             eval_matches=args.eval_matches, resume=args.resume, self_play=args.self_play,
+             opponents=args.opponents, pool_size=args.pool_size, pool_freq=args.pool_freq)
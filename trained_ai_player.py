@@ -1,74 +1,92 @@
-from time import time
 import numpy as np
 from player import Player
 from config import *
+from observation import OBSERVATION_SIZE, GameEncoder
 import os
 
+MODEL_MTIME_SLACK = 2.0
+
 class TrainedAIPlayer(Player):
-    def __init__(self, x, y, model=None):
+    # Decides every decision_interval ticks and holds the action in between, like
+    # training with action_repeat. Models trained on stacked frames get the
+    # last observations concatenated, oldest first, as VecFrameStack does.
+    # The model can be an inference_server.InferenceClient, in which case the
+    # decisions are made by a shared server.
+    def __init__(self, x, y, model=None, decision_interval=None):
         super().__init__(x, y, PLAYER2_COLOR, "Trained AI Player")
         self.model = model
         self.last_action = 0
+        self.decision_interval = decision_interval or getattr(model, "action_repeat", 1)
+        self.ticks = 0
+        self.stacked_observation = None
+        self.encoder = GameEncoder()
+        if model is not None:
+            size = getattr(model, "observation_size", None) or model.observation_space.shape[0]
+            self.stacked_observation = np.zeros(size, dtype=np.float32)
 
-    def _get_observation(self, falling_objects):
-        ai_center = self.x + self.width // 2
-
-        threats = []
-        for obj in falling_objects:
-            if obj.y < SCREEN_HEIGHT * 0.6:
-                obj_center = obj.x + obj.size // 2
-                horizontal_distance = (obj_center - ai_center) / SCREEN_WIDTH
-                vertical_distance = (SCREEN_HEIGHT - obj.y) / SCREEN_HEIGHT
-                threats.append([horizontal_distance, vertical_distance, obj.speed / OBJECT_MAX_SPEED])
-
-        threats.sort(key=lambda t: t[1])
-        threats = threats[:3]
-
-        while len(threats) < 3:
-            threats.append([0, 1, 0])
-
-        observation = [
-            ai_center / SCREEN_WIDTH,
-            (SCREEN_WIDTH - self.x) / SCREEN_WIDTH,
-            self.x / SCREEN_WIDTH,
-        ]
-
-        for threat in threats:
-            observation.extend(threat)
-
-        return np.array(observation, dtype=np.float32)
+    def _get_observation(self, falling_objects, out=None):
+        return self.encoder.encode(self.x, falling_objects, out)
 
     def update(self, falling_objects):
         if self.model is None:
             return
 
-        observation = self._get_observation(falling_objects)
-        action, _states = self.model.predict(observation, deterministic=True)
-        #print ai action every 3 seconds
-        if time() % 3 < 0.1:
-            print(f"AI Action: {action}")
-        
+        if self.ticks % self.decision_interval == 0:
+            stacked = self.stacked_observation
+            stacked[:-OBSERVATION_SIZE] = stacked[OBSERVATION_SIZE:]
+            self._get_observation(falling_objects, stacked[-OBSERVATION_SIZE:])
+            self.last_action, _states = self.model.predict(stacked, deterministic=True)
+        self.ticks += 1
 
-        if action == 1:
+        if self.last_action == 1:
             self.move(-1)
-        elif action == 2:
+        elif self.last_action == 2:
             self.move(1)
 
-        self.last_action = action
-
-def load_trained_model():
-    from stable_baselines3 import PPO
+def load_trained_model(server=None):
+    # With a server socket path, connect to a running inference_server.py instead of loading weights
+    if server is not None:
+        from inference_server import InferenceClient
+        try:
+            model = InferenceClient(server)
+            print(f"Connected to inference server at {server}")
+            return model
+        except OSError as e:
+            print(f"Error connecting to inference server at {server}: {e}")
+            return None
 
     model_path = "models/dodge_game_ppo"
-
-    if not os.path.exists(f"{model_path}.zip"):
-        print(f"Error: Trained model not found at {model_path}.zip")
+    policy_path = f"{model_path}.npz"
+    zip_path = f"{model_path}.zip"
+
+    # The exported NumPy weights avoid importing stable_baselines3 and torch.
+    # train_ai.py rewrites them every time it saves the model, so a .zip newer
+    # than the .npz (an interrupted export, a model copied in by hand) wins.
+    # A checkout writes the pair moments apart in either order, hence the slack.
+    stale = (os.path.exists(policy_path) and os.path.exists(zip_path) and
+             os.path.getmtime(zip_path) > os.path.getmtime(policy_path) + MODEL_MTIME_SLACK)
+    if stale:
+        print(f"{policy_path} is older than {zip_path}, loading the .zip instead")
+    elif os.path.exists(policy_path):
+        try:
+            from numpy_policy import load_numpy_policy
+            model = load_numpy_policy(policy_path)
+            print("Trained AI policy loaded successfully!")
+            return model
+        except Exception as e:
+            print(f"Error loading exported policy: {e}")
+
+    if not os.path.exists(zip_path):
+        print(f"Error: Trained model not found at {zip_path}")
         print("Please run: python train_ai.py")
         return None
 
+    from stable_baselines3 import PPO
+
     try:
         model = PPO.load(model_path)
         print("Trained AI model loaded successfully!")
+        print("Tip: run python numpy_policy.py for a faster, torch-free startup")
         return model
     except Exception as e:
         print(f"Error loading model: {e}")
@@ -1,26 +1,30 @@
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
+import random
 from config import *
-from falling_object import FallingObject
+from simulation import World, TRAINING_MAX_OBJECTS, training_spawn_rate
+from profiler import FrameProfiler
+from observation import OBSERVATION_SIZE, GameEncoder
 
 class DodgeGameEnv(gym.Env):
     metadata = {"render_modes": []}
     
-    def __init__(self, render_mode=None):
+    def __init__(self, render_mode=None, profiler=None):
         super().__init__()
         self.render_mode = render_mode
+        self.profiler = profiler if profiler is not None else FrameProfiler(enabled=False)
         self.action_space = spaces.Discrete(3)
         self.observation_space = spaces.Box(
             low=0,
             high=255,
-            shape=(12,),
+            shape=(OBSERVATION_SIZE,),
             dtype=np.float32
         )
         
         self.ai_x = SCREEN_WIDTH // 2
-        self.falling_objects = []
-        self.frame_count = 0
+        self.world = World(max_objects=TRAINING_MAX_OBJECTS)
+        self.encoder = GameEncoder()
         self.steps = 0
         self.max_steps = 10000
         self.game_over = False
@@ -29,9 +33,10 @@ class DodgeGameEnv(gym.Env):
     
     def reset(self, seed=None):
         super().reset(seed=seed)
+        if seed is not None:
+            self.world.rng = random.Random(seed)
         self.ai_x = SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2
-        self.falling_objects = []
-        self.frame_count = 0
+        self.world.reset()
         self.steps = 0
         self.game_over = False
         self.collision_count = 0
@@ -39,65 +44,23 @@ class DodgeGameEnv(gym.Env):
         observation = self._get_observation()
         return observation, {}
     
+    @property
+    def falling_objects(self):
+        return self.world.falling_objects
+
     def _get_observation(self):
-        ai_center = self.ai_x + PLAYER_WIDTH // 2
-        threats = []
-        
-        for obj in self.falling_objects:
-            if obj.y < SCREEN_HEIGHT * 0.6:
-                obj_center = obj.x + obj.size // 2
-                horizontal_distance = (obj_center - ai_center) / SCREEN_WIDTH
-                vertical_distance = (SCREEN_HEIGHT - obj.y) / SCREEN_HEIGHT
-                threats.append([horizontal_distance, vertical_distance, obj.speed / OBJECT_MAX_SPEED])
-        
-        threats.sort(key=lambda t: t[1])
-        threats = threats[:3]
-        
-        while len(threats) < 3:
-            threats.append([0, 1, 0])
-        
-        observation = [
-            ai_center / SCREEN_WIDTH,
-            (SCREEN_WIDTH - self.ai_x) / SCREEN_WIDTH,
-            self.ai_x / SCREEN_WIDTH,
-        ]
-        
-        for threat in threats:
-            observation.extend(threat)
-        
-        return np.array(observation, dtype=np.float32)
-    
-    def _spawn_objects(self):
-        self.frame_count += 1
-        if self.steps < 1000:
-            spawn_rate = 60
-        elif self.steps < 3000:
-            spawn_rate = 50
-        else:
-            spawn_rate = 40
-        
-        if self.frame_count % spawn_rate == 0 and len(self.falling_objects) < 15:
-            self.falling_objects.append(FallingObject())
+        return self.encoder.encode(self.ai_x, self.world.falling_objects)
     
     def _check_collision(self):
-        ai_rect = (self.ai_x, SCREEN_HEIGHT - PLAYER_HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT)
-        
-        for obj in self.falling_objects:
-            if (ai_rect[0] < obj.x + obj.size and
-                ai_rect[0] + ai_rect[2] > obj.x and
-                ai_rect[1] < obj.y + obj.size and
-                ai_rect[1] + ai_rect[3] > obj.y):
-                return True
-        return False
+        return self.world.collides(self.ai_x, SCREEN_HEIGHT - PLAYER_HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT)
     
     def _calculate_near_miss_reward(self):
-        ai_rect = (self.ai_x, SCREEN_HEIGHT - PLAYER_HEIGHT, PLAYER_WIDTH, PLAYER_HEIGHT)
+        ai_center = self.ai_x + PLAYER_WIDTH // 2
         near_miss_reward = 0.0
-        for obj in self.falling_objects:
-            if SCREEN_HEIGHT - 120 < obj.y < SCREEN_HEIGHT - 40:
-                horizontal_dist = abs((self.ai_x + PLAYER_WIDTH//2) - (obj.x + obj.size//2))
-                if horizontal_dist < 80:
-                    near_miss_reward += 0.4
+        for obj in self.world.in_band(SCREEN_HEIGHT - 120, SCREEN_HEIGHT - 40, ai_center - 80, ai_center + 80):
+            horizontal_dist = abs(ai_center - (obj.x + obj.size//2))
+            if horizontal_dist < 80:
+                near_miss_reward += 0.4
         return near_miss_reward
 
     
@@ -105,6 +68,8 @@ class DodgeGameEnv(gym.Env):
         if self.game_over:
             return self._get_observation(), 0.0, True, False, {}
 
+        profiler = self.profiler
+        profiler.next_frame()
         self.steps += 1
 
         if action == 1:
@@ -112,19 +77,20 @@ class DodgeGameEnv(gym.Env):
         elif action == 2:
             self.ai_x = min(SCREEN_WIDTH - PLAYER_WIDTH, self.ai_x + PLAYER_SPEED * 2)
 
-        self._spawn_objects()
-        for obj in self.falling_objects:
-            obj.update()
-        self.falling_objects = [obj for obj in self.falling_objects if not obj.is_off_screen()]
+        self.world.step(training_spawn_rate(self.steps))
+        profiler.mark("objects")
 
         collision = self._check_collision()
+        profiler.mark("collisions")
         observation = self._get_observation()
+        profiler.mark("observation")
 
         reward = 0.0
 
         reward += 0.05
 
         near_miss = self._calculate_near_miss_reward()
+        profiler.mark("near_miss")
         reward += near_miss * 1.5  
 
         if self.ai_x < 30 or self.ai_x > SCREEN_WIDTH - PLAYER_WIDTH - 30:
@@ -149,3 +115,20 @@ class DodgeGameEnv(gym.Env):
     
     def close(self):
         pass
+
+
+class ActionRepeat(gym.Wrapper):
+    # Holds each action for `repeat` physics ticks, summing the rewards and
+    # stopping early when the episode ends part-way through.
+    def __init__(self, env, repeat=4):
+        super().__init__(env)
+        self.repeat = repeat
+
+    def step(self, action):
+        total_reward = 0.0
+        for _ in range(self.repeat):
+            observation, reward, terminated, truncated, info = self.env.step(action)
+            total_reward += reward
+            if terminated or truncated:
+                break
+        return observation, total_reward, terminated, truncated, info
@@ -0,0 +1,118 @@
+import os
+import time
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class TimedVecEnv(VecEnvWrapper):
+    # Times every vectorized step so collection time can be split into env and policy time
+    def __init__(self, venv):
+        super().__init__(venv)
+        self.step_started = 0.0
+        self.step_times = []
+        self.worker_step_times = []
+
+    def reset(self):
+        return self.venv.reset()
+
+    def step_async(self, actions):
+        self.step_started = time.perf_counter()
+        self.venv.step_async(actions)
+
+    def step_wait(self):
+        result = self.venv.step_wait()
+        self.step_times.append(time.perf_counter() - self.step_started)
+        worker_times = getattr(self.venv, "worker_step_times", None)
+        if worker_times is not None:
+            self.worker_step_times.extend(worker_times)
+        return result
+
+    def drain(self):
+        step_times, worker_step_times = self.step_times, self.worker_step_times
+        self.step_times, self.worker_step_times = [], []
+        return step_times, worker_step_times
+
+
+def find_timed_env(env):
+    while env is not None:
+        if isinstance(env, TimedVecEnv):
+            return env
+        env = getattr(env, "venv", None)
+    return None
+
+
+def memory_mb():
+    # Resident memory of the learner plus its env workers, or the learner's peak without psutil
+    if psutil is None:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    process = psutil.Process(os.getpid())
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            rss += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return rss / 1e6
+
+
+class TrainingMetricsCallback(BaseCallback):
+    # Logs per-rollout throughput, where the wall time went, step latency and memory.
+    # PPO dumps its logs between collecting and training, so time/train_s shows
+    # the update that followed the previous rollout. Each policy decision is
+    # held for action_repeat physics ticks, which env step rates count.
+    def __init__(self, action_repeat=1, verbose=0):
+        super().__init__(verbose)
+        self.action_repeat = action_repeat
+        self.timed_env = None
+        self.rollout_started = None
+        self.rollout_ended = None
+
+    def _on_training_start(self):
+        self.timed_env = find_timed_env(self.training_env)
+
+    def _on_rollout_start(self):
+        now = time.perf_counter()
+        if self.rollout_ended is not None:
+            self.logger.record("time/train_s", now - self.rollout_ended)
+        self.rollout_started = now
+        if self.timed_env is not None:
+            self.timed_env.drain()
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        now = time.perf_counter()
+        self.rollout_ended = now
+        collect_time = now - self.rollout_started
+        decisions = self.model.n_steps * self.training_env.num_envs
+        # Episodes ending part-way through a decision make this a slight overcount
+        n_steps = decisions * self.action_repeat
+        self.logger.record("throughput/decisions_per_sec", decisions / collect_time)
+        self.logger.record("throughput/env_steps_per_sec", n_steps / collect_time)
+        self.logger.record("time/collect_s", collect_time)
+        self.logger.record("memory/rss_mb", memory_mb())
+
+        if self.timed_env is None:
+            return
+        step_times, worker_step_times = self.timed_env.drain()
+        if not step_times:
+            return
+        env_time = sum(step_times)
+        step_times = np.asarray(step_times) * 1e3
+        self.logger.record("time/env_s", env_time)
+        self.logger.record("time/policy_s", collect_time - env_time)
+        self.logger.record("throughput/env_only_steps_per_sec", n_steps / env_time)
+        self.logger.record("latency/step_p50_ms", np.percentile(step_times, 50))
+        self.logger.record("latency/step_p99_ms", np.percentile(step_times, 99))
+        if worker_step_times:
+            worker_step_times = np.asarray(worker_step_times) * 1e3
+            self.logger.record("latency/worker_step_p50_ms", np.percentile(worker_step_times, 50))
+            self.logger.record("latency/worker_step_p99_ms", np.percentile(worker_step_times, 99))
@@ -0,0 +1,189 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+from config import *
+from simulation import TRAINING_MAX_OBJECTS as MAX_OBJECTS, TRAINING_SPAWN_CURRICULUM, TRAINING_FINAL_SPAWN_RATE
+from observation import OBSERVATION_SIZE, ObservationEncoder
+
+NEAR_MISS_BONUS = 0.4
+
+# Summing the bonus one object at a time (as DodgeGameEnv does) gives slightly
+# different floats than multiplying, so precompute the running sums.
+_NEAR_MISS_TABLE = np.zeros(MAX_OBJECTS + 1)
+for _count in range(1, MAX_OBJECTS + 1):
+    _NEAR_MISS_TABLE[_count] = _NEAR_MISS_TABLE[_count - 1] + NEAR_MISS_BONUS
+
+
+class DodgeVecEnv(VecEnv):
+    def __init__(self, n_envs=4, seed=None, max_steps=10000, action_repeat=1):
+        self.render_mode = None
+        self.max_steps = max_steps
+        self.action_repeat = action_repeat
+        observation_space = spaces.Box(low=0, high=255, shape=(OBSERVATION_SIZE,), dtype=np.float32)
+        action_space = spaces.Discrete(3)
+        super().__init__(n_envs, observation_space, action_space)
+
+        self.rng = np.random.default_rng(seed)
+        self.actions = np.zeros(n_envs, dtype=np.int64)
+
+        self.ai_x = np.full(n_envs, SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2, dtype=np.int64)
+        self.steps = np.zeros(n_envs, dtype=np.int64)
+        self.count = np.zeros(n_envs, dtype=np.int64)
+        self.collision_count = np.zeros(n_envs, dtype=np.int64)
+
+        shape = (n_envs, MAX_OBJECTS)
+        self.obj_x = np.zeros(shape, dtype=np.int64)
+        self.obj_y = np.zeros(shape, dtype=np.float64)
+        self.obj_size = np.zeros(shape, dtype=np.int64)
+        self.obj_speed = np.zeros(shape, dtype=np.float64)
+        self.alive = np.zeros(shape, dtype=bool)
+
+        self.buf_obs = np.zeros((n_envs, OBSERVATION_SIZE), dtype=np.float32)
+        self.encoder = ObservationEncoder(n_envs, MAX_OBJECTS)
+
+    def _reset_envs(self, mask):
+        self.ai_x[mask] = SCREEN_WIDTH // 2 - PLAYER_WIDTH // 2
+        self.steps[mask] = 0
+        self.count[mask] = 0
+        self.alive[mask] = False
+
+    def reset(self):
+        if self._seeds[0] is not None:
+            self.rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self._write_observations(self.buf_obs)
+        return self.buf_obs.copy()
+
+    def step_async(self, actions):
+        self.actions = np.asarray(actions).reshape(self.num_envs)
+
+    def _spawn_objects(self, active):
+        spawn_rate = np.full(self.num_envs, TRAINING_FINAL_SPAWN_RATE)
+        for max_steps, rate in reversed(TRAINING_SPAWN_CURRICULUM):
+            spawn_rate[self.steps < max_steps] = rate
+        spawning = active & (self.steps % spawn_rate == 0) & (self.count < MAX_OBJECTS)
+        rows = np.flatnonzero(spawning)
+        if len(rows) == 0:
+            return
+
+        slots = self.count[rows]
+        size = self.rng.integers(OBJECT_MIN_SIZE, OBJECT_MAX_SIZE + 1, size=len(rows))
+        self.obj_size[rows, slots] = size
+        self.obj_x[rows, slots] = self.rng.integers(0, SCREEN_WIDTH - size + 1)
+        self.obj_y[rows, slots] = -size
+        self.obj_speed[rows, slots] = self.rng.uniform(OBJECT_MIN_SPEED, OBJECT_MAX_SPEED, size=len(rows))
+        self.alive[rows, slots] = True
+        self.count[rows] += 1
+
+    def _cull_objects(self):
+        self.alive &= self.obj_y <= SCREEN_HEIGHT
+        # Stable compaction keeps every row in spawn order, like the list filter
+        # in DodgeGameEnv, so observation tie-breaking is identical.
+        order = np.argsort(~self.alive, axis=1, kind="stable")
+        self.obj_x = np.take_along_axis(self.obj_x, order, axis=1)
+        self.obj_y = np.take_along_axis(self.obj_y, order, axis=1)
+        self.obj_size = np.take_along_axis(self.obj_size, order, axis=1)
+        self.obj_speed = np.take_along_axis(self.obj_speed, order, axis=1)
+        self.alive = np.take_along_axis(self.alive, order, axis=1)
+        self.count = self.alive.sum(axis=1)
+
+    def _check_collisions(self):
+        ai_x = self.ai_x[:, None]
+        hits = (
+            self.alive &
+            (ai_x < self.obj_x + self.obj_size) &
+            (ai_x + PLAYER_WIDTH > self.obj_x) &
+            (SCREEN_HEIGHT - PLAYER_HEIGHT < self.obj_y + self.obj_size) &
+            (SCREEN_HEIGHT > self.obj_y)
+        )
+        return hits.any(axis=1)
+
+    def _near_miss_rewards(self):
+        ai_center = self.ai_x[:, None] + PLAYER_WIDTH // 2
+        near = (
+            self.alive &
+            (SCREEN_HEIGHT - 120 < self.obj_y) &
+            (self.obj_y < SCREEN_HEIGHT - 40) &
+            (np.abs(ai_center - (self.obj_x + self.obj_size // 2)) < 80)
+        )
+        return _NEAR_MISS_TABLE[near.sum(axis=1)]
+
+    def _write_observations(self, out):
+        self.encoder.encode(self.ai_x, self.obj_x, self.obj_y, self.obj_size, self.obj_speed, self.alive, out)
+
+    @staticmethod
+    def _move(x, actions):
+        x = np.where(actions == 1, np.maximum(0, x - PLAYER_SPEED * 2), x)
+        return np.where(actions == 2, np.minimum(SCREEN_WIDTH - PLAYER_WIDTH, x + PLAYER_SPEED * 2), x)
+
+    def _advance_objects(self, active):
+        self._spawn_objects(active)
+        self.obj_y += np.where(self.alive & active[:, None], self.obj_speed, 0)
+        self._cull_objects()
+
+    def _shaping_rewards(self):
+        # Per-tick reward before any collision or time limit: surviving, near misses, keeping off the edges
+        rewards = np.full(self.num_envs, 0.05)
+        rewards += self._near_miss_rewards() * 1.5
+        edge = (self.ai_x < 30) | (self.ai_x > SCREEN_WIDTH - PLAYER_WIDTH - 30)
+        rewards -= np.where(edge, 0.05, 0.0)
+        return rewards
+
+    def _tick(self, active):
+        # One physics tick for the active envs; finished envs stay frozen
+        self.steps += active
+        self.ai_x = self._move(self.ai_x, np.where(active, self.actions, 0))
+        self._advance_objects(active)
+
+        collision = self._check_collisions() & active
+
+        rewards = self._shaping_rewards()
+        rewards -= np.where(collision, 3.0, 0.0)
+        self.collision_count += collision
+
+        truncated = active & (self.steps >= self.max_steps)
+        rewards += np.where(truncated, 1.0, 0.0)
+        return np.where(active, rewards, 0.0), collision | truncated
+
+    def step_wait(self):
+        # Each decision is held for action_repeat ticks with the rewards summed.
+        # An env that finishes part-way stops there and reports its terminal state.
+        rewards = np.zeros(self.num_envs)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        for _ in range(self.action_repeat):
+            tick_rewards, finished = self._tick(~dones)
+            rewards += tick_rewards
+            dones |= finished
+            if dones.all():
+                break
+        self._write_observations(self.buf_obs)
+
+        infos = [{"TimeLimit.truncated": False} for _ in range(self.num_envs)]
+        observations = self.buf_obs.copy()
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            for env_idx in finished:
+                infos[env_idx]["terminal_observation"] = observations[env_idx].copy()
+            self._reset_envs(dones)
+            self._write_observations(self.buf_obs)
+            observations[finished] = self.buf_obs[finished]
+
+        return observations, rewards.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
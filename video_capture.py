@@ -0,0 +1,135 @@
+import json
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import numpy as np
+from config import *
+
+CAPTURE_QUEUE_FRAMES = 8
+CAPTURE_CODEC = "libx264"
+
+
+def pixel_format(surface):
+    # ffmpeg's name for the surface's byte order, e.g. "bgr0" for the usual 32-bit display
+    bytesize = surface.get_bytesize()
+    if bytesize not in (3, 4):
+        raise ValueError(f"cannot capture a {8 * bytesize}-bit surface")
+    channels = ["0"] * bytesize
+    for name, shift, mask in zip("rgba", surface.get_shifts(), surface.get_masks()):
+        if mask:
+            channels[shift // 8] = name
+    if sys.byteorder == "big":
+        channels.reverse()
+    name = "".join(channels)
+    return name + "24" if bytesize == 3 else name
+
+
+class VideoCapture:
+    # Copies the display into one of a few preallocated frame buffers and queues
+    # it for a writer thread, which pipes frames to ffmpeg or appends them to a
+    # raw file. When every buffer is still waiting to be written the frame is
+    # dropped, so a slow disk or encoder never stalls the game loop. With
+    # drop_frames=False capture waits for a buffer instead, for offline renders.
+    def __init__(self, path, surface, fps=FPS, queue_frames=CAPTURE_QUEUE_FRAMES, codec=CAPTURE_CODEC,
+                 drop_frames=True):
+        self.path = path
+        self.fps = fps
+        self.drop_frames = drop_frames
+        self.width, self.height = surface.get_size()
+        self.row_bytes = self.width * surface.get_bytesize()
+        self.pix_fmt = pixel_format(surface)
+        self.free = queue.Queue()
+        for _ in range(queue_frames):
+            self.free.put(np.empty((self.height, self.row_bytes), dtype=np.uint8))
+        self.filled = queue.Queue()
+        self.frames = 0
+        self.written = 0
+        self.dropped = 0
+        self.error = None
+
+        self.process = None
+        if path.endswith(".raw"):
+            self.output = open(path, "wb")
+        else:
+            ffmpeg = shutil.which("ffmpeg")
+            if ffmpeg is None:
+                raise RuntimeError(f"ffmpeg not found: install it or capture to a .raw file instead of {path}")
+            self.process = subprocess.Popen(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", self.pix_fmt,
+                 "-s", f"{self.width}x{self.height}", "-r", str(fps), "-i", "-",
+                 "-c:v", codec, "-preset", "veryfast", "-pix_fmt", "yuv420p", path],
+                stdin=subprocess.PIPE)
+            self.output = self.process.stdin
+
+        self.writer = threading.Thread(target=self.write_frames, name="video-writer", daemon=True)
+        self.writer.start()
+
+    def wants_frame(self):
+        # False when the next frame would be dropped, so the caller can skip drawing it too
+        if not self.drop_frames or not self.free.empty():
+            return True
+        self.frames += 1
+        self.dropped += 1
+        return False
+
+    def capture(self, surface):
+        # One copy of the display's pixels, straight from its buffer. Returns False if dropped.
+        self.frames += 1
+        try:
+            frame = self.free.get(block=not self.drop_frames)
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        buffer = surface.get_buffer()
+        pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(self.height, surface.get_pitch())
+        np.copyto(frame, pixels[:, :self.row_bytes])
+        del pixels, buffer
+        self.filled.put(frame)
+        return True
+
+    def write_frames(self):
+        # File and pipe writes release the GIL, so this overlaps with the game loop
+        while True:
+            frame = self.filled.get()
+            if frame is None:
+                return
+            if self.error is None:
+                try:
+                    self.output.write(frame)
+                    self.written += 1
+                except OSError as error:
+                    self.error = error
+            self.free.put(frame)
+
+    def close(self):
+        self.filled.put(None)
+        self.writer.join()
+        try:
+            self.output.close()
+        except OSError as error:
+            self.error = self.error or error
+        if self.process is not None:
+            self.process.wait()
+        else:
+            self.write_meta()
+
+        dropped = self.dropped / max(self.frames, 1)
+        print(f"Video: {self.written} frames written to {self.path}, {self.dropped} dropped ({dropped:.1%})")
+        if self.error is not None:
+            print(f"Video writer stopped early: {self.error}")
+
+    def write_meta(self):
+        meta = {
+            "width": self.width,
+            "height": self.height,
+            "pix_fmt": self.pix_fmt,
+            "fps": self.fps,
+            "frames": self.written,
+            "dropped": self.dropped,
+            "encode": (f"ffmpeg -f rawvideo -pix_fmt {self.pix_fmt} -s {self.width}x{self.height} "
+                       f"-r {self.fps} -i {self.path} -pix_fmt yuv420p video.mp4"),
+        }
+        with open(f"{self.path}.json", "w") as f:
+            json.dump(meta, f, indent=2)